@@ -1,64 +1,695 @@
-def fixedInvestor(principal, rate, years, contribution):
+from collections import deque
+
+import numpy as np
+
+from history import BalanceHistory
+from quantiles import BalanceSketch, RunningMoments
+
+
+# Longest withdrawal history finallyRetired builds when solving for depletion.
+DEPLETION_HORIZON = 1000
+
+# Percentile bands reported by monteCarlo for every simulated year.
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Search interval for requiredRate: just above -100% up to 1000% a year.
+RATE_BRACKET = (-1 + 1e-9, 10.0)
+
+# Relative amount safeWithdrawal stays below the marginal path's critical
+# withdrawal, far more than the rounding in a simulated balance, so that
+# path ends with money left under monteCarlo and successProbability alike.
+SAFE_WITHDRAWAL_MARGIN = 1e-9
+
+
+def _growthFactors(rate, years):
+    """
+    Return ((1 + rate) ** years, ((1 + rate) ** years - 1) / rate) for
+    scalars or arrays, using the zero-rate limit (years) for the annuity
+    factor when rate == 0.
+    """
+    rate = np.asarray(rate, dtype=np.float64)
+    years = np.asarray(years, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logGrowth = years * np.log1p(rate)
+        annuity = np.where(rate == 0, years, np.expm1(logGrowth) / rate)
+    return np.exp(logGrowth), annuity
+
+
+def fixedFutureValue(principal, rate, years, contribution):
+    """
+    Closed-form final balance of fixedInvestor: the principal compounded
+    for 'years' plus the future value of an annuity of 'contribution'.
+    Accepts scalars or broadcastable arrays.
+    """
+    growth, annuity = _growthFactors(rate, years)
+    return (np.asarray(principal) * growth + np.asarray(contribution) * annuity)[()]
+
+
+def retiredFutureValue(principal, withdrawal, rate, years):
+    """
+    Closed-form balance left after 'years' of finallyRetired, floored at
+    zero once the money runs out. Accepts scalars or broadcastable arrays.
+    """
+    growth, annuity = _growthFactors(rate, years)
+    balance = np.asarray(principal) * growth - np.asarray(withdrawal) * annuity
+    return np.maximum(balance, 0.0)[()]
+
+
+def fixedInvestor(principal, rate, years, contribution, keep_history=True):
+    if not keep_history:
+        return fixedFutureValue(principal, rate, years, contribution), None
     balance = principal
-    history = []
+    history = BalanceHistory()
     for _ in range(years):
         balance = balance * (1 + rate) + contribution
         history.append(balance)
     return balance, history
 
 
-def variableInvestor(principal, rateList, contribution):
+def iterVariableInvestor(principal, rates, contribution):
+    """
+    Lazily yield the balance after each year for any iterable of rates,
+    e.g. readRates(path), so long horizons never hold a history in memory.
+    """
     balance = principal
-    history = []
-    for r in rateList:
+    for r in rates:
         balance = balance * (1 + r) + contribution
-        history.append(balance)
+        yield balance
+
+
+def variableInvestor(principal, rateList, contribution):
+    history = BalanceHistory(iterVariableInvestor(principal, rateList, contribution))
+    balance = history[-1] if history else principal
     return balance, history
 
 
-def finallyRetired(principal, withdrawal, rate, years=None):
+def iterFinallyRetired(principal, withdrawal, rate, years=None):
     """
-    Simulate withdrawals post-retirement.
-    If years is None, run until balance reaches zero.
-    If years is specified, simulate exactly that many years.
+    Lazily yield the balance after each retirement year.
+    If years is None, stop after the year the balance reaches zero; a
+    sustainable withdrawal then yields forever, so take what you need
+    with itertools.islice.
+    If years is specified, yield exactly that many years.
     """
     balance = principal
     year = 0
-    history = []
-
-    if years is None:  # old behavior: until depletion
-        while balance > 0:
-            balance = balance * (1 + rate) - withdrawal
-            if balance < 0:
-                balance = 0
-            history.append(balance)
-            year += 1
+    while (balance > 0) if years is None else (year < years):
+        balance = balance * (1 + rate) - withdrawal
+        if balance < 0:
+            balance = 0
+        yield balance
+        year += 1
+
+
+def readRates(path):
+    """
+    Yield one rate per non-blank line of a text file without reading the
+    whole file. Lines starting with '#' are skipped.
+    """
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield float(line.replace(",", ""))
+
+
+def lastBalance(balances, default=None):
+    """Consume an iterable of balances in O(1) memory and return the last one."""
+    tail = deque(balances, maxlen=1)
+    return tail[0] if tail else default
+
+
+def depletionYears(principal, withdrawal, rate):
+    """
+    Number of years finallyRetired needs to run the balance down to zero,
+    solved with logarithms instead of a year-by-year loop:
+    n = ceil(log(withdrawal / (withdrawal - principal * rate)) / log(1 + rate)).
+    Returns inf when the withdrawal is sustainable forever
+    (principal * rate >= withdrawal). Accepts scalars or broadcastable arrays.
+    """
+    principal, withdrawal, rate = np.broadcast_arrays(
+        np.asarray(principal, dtype=np.float64),
+        np.asarray(withdrawal, dtype=np.float64),
+        np.asarray(rate, dtype=np.float64),
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shortfall = withdrawal - principal * rate
+        exact = np.where(
+            rate == 0,
+            principal / withdrawal,
+            np.log(withdrawal / shortfall) / np.log1p(rate),
+        )
+        years = np.ceil(exact)
+        # Nudge by one year where rounding put the formula on the wrong
+        # side of the zero crossing.
+        years += retiredFutureValue(principal, withdrawal, rate, years) > 0
+        previous = np.maximum(years - 1, 0)
+        years -= (years > 1) & (retiredFutureValue(principal, withdrawal, rate, previous) <= 0)
+    years = np.where(shortfall > 0, years, np.inf)
+    years = np.where(rate <= -1, 1, years)
+    years = np.where(principal <= 0, 0, years)
+    return years[()]
+
+
+def finallyRetired(principal, withdrawal, rate, years=None, horizon=DEPLETION_HORIZON):
+    """
+    Simulate withdrawals post-retirement.
+    If years is None, return the year the balance reaches zero (inf if it
+    never does), solved analytically by depletionYears; the history covers
+    at most 'horizon' years.
+    If years is specified, simulate exactly that many years.
+    """
+    if years is None:
+        depleted = depletionYears(principal, withdrawal, rate)
+        history = BalanceHistory(iterFinallyRetired(principal, withdrawal, rate, int(min(depleted, horizon))))
+        if depleted <= horizon and history:
+            history[-1] = 0
+        year = int(depleted) if np.isfinite(depleted) else depleted
     else:
-        for _ in range(years):
-            balance = balance * (1 + rate) - withdrawal
-            if balance < 0:
-                balance = 0
-            history.append(balance)
-            year += 1
+        history = BalanceHistory(iterFinallyRetired(principal, withdrawal, rate, years))
+        year = len(history)
 
     return year, history
 
 
 def maximumExpensed(principal, rate, years):
     """
-    Binary search to find maximum sustainable annual withdrawal
-    over exactly 'years' retirement years.
+    Maximum sustainable annual withdrawal that depletes 'principal' over
+    exactly 'years' retirement years, from the present value of an annuity:
+    principal * (1 + rate) ** years / (((1 + rate) ** years - 1) / rate).
+    Accepts scalars or broadcastable arrays.
+    """
+    growth, annuity = _growthFactors(rate, years)
+    principal = np.asarray(principal, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        withdrawal = np.where(annuity > 0, principal * growth / annuity, principal)
+    return withdrawal[()]
+
+
+def batchFixedInvestor(principals, rates, years, contributions, keep_history=False):
+    """
+    Vectorized fixedInvestor over many scenarios at once.
+    principals, rates and contributions are scalars or 1-D arrays that
+    broadcast to the number of scenarios; years is shared by all of them.
+    Returns (balances, history) where history is a (scenarios x years)
+    array when keep_history is True, otherwise None.
+    """
+    principals, rates, contributions = np.broadcast_arrays(
+        np.asarray(principals, dtype=np.float64),
+        np.asarray(rates, dtype=np.float64),
+        np.asarray(contributions, dtype=np.float64),
+    )
+    if not keep_history:
+        return np.asarray(fixedFutureValue(principals, rates, years, contributions)), None
+    growth = 1 + rates
+    balance = principals.astype(np.float64, copy=True)
+    history = np.empty(balance.shape + (years,))
+    for t in range(years):
+        balance *= growth
+        balance += contributions
+        history[..., t] = balance
+    return balance, history
+
+
+def batchVariableInvestor(principals, rateMatrix, contributions, keep_history=False):
+    """
+    Vectorized variableInvestor over many scenarios at once.
+    rateMatrix is either a 1-D list of yearly rates shared by every
+    scenario or a 2-D (scenarios x years) array of per-scenario rates.
+    Returns (balances, history) like batchFixedInvestor.
+    """
+    rateMatrix = np.asarray(rateMatrix, dtype=np.float64)
+    if rateMatrix.ndim == 1:
+        rateMatrix = rateMatrix[np.newaxis, :]
+    principals, contributions = np.broadcast_arrays(
+        np.asarray(principals, dtype=np.float64),
+        np.asarray(contributions, dtype=np.float64),
+    )
+    shape = np.broadcast_shapes(principals.shape, rateMatrix.shape[:-1])
+    years = rateMatrix.shape[-1]
+    growth = 1 + rateMatrix
+    balance = np.broadcast_to(principals, shape).astype(np.float64, copy=True)
+    contributions = np.broadcast_to(contributions, shape)
+    history = np.empty(shape + (years,)) if keep_history else None
+    for t in range(years):
+        balance *= growth[..., t]
+        balance += contributions
+        if history is not None:
+            history[..., t] = balance
+    return balance, history
+
+
+def lifecycle(principal, rate, years, contribution, retireYears, withdrawal=None, retireRate=None):
+    """
+    Run accumulation and retirement for one or many scenarios in a single
+    pass over one preallocated (scenarios x (years + retireYears)) array.
+    principal, rate, contribution, withdrawal and retireRate (default: the
+    accumulation rate) are scalars or 1-D arrays broadcast to the number of
+    scenarios; years and retireYears are shared. With withdrawal=None each
+    scenario withdraws its optimal amount, maximumExpensed of its balance at
+    retirement, so the optimum needs no second simulation.
+    Returns a dict with the 'history' array, its 'accumulation' and
+    'retirement' views, and per scenario the 'retirement_balance',
+    'optimal_withdrawal', the 'withdrawal' used, the 'final_balance' and the
+    'depletion_year' of retirement the money ran out (inf if it lasted).
+    """
+    rate = np.asarray(rate, dtype=np.float64)
+    retireRate = rate if retireRate is None else np.asarray(retireRate, dtype=np.float64)
+    principal, rate, contribution, retireRate = np.broadcast_arrays(
+        np.asarray(principal, dtype=np.float64), rate,
+        np.asarray(contribution, dtype=np.float64), retireRate,
+    )
+    history = np.empty(principal.shape + (years + retireYears,))
+    balance = principal.copy()
+    growth = 1 + rate
+    for t in range(years):
+        balance *= growth
+        balance += contribution
+        history[..., t] = balance
+
+    retirementBalance = balance.copy()
+    optimal = np.asarray(maximumExpensed(retirementBalance, retireRate, retireYears))
+    withdrawal = optimal if withdrawal is None else np.broadcast_to(
+        np.asarray(withdrawal, dtype=np.float64), principal.shape)
+    growth = 1 + retireRate
+    for t in range(years, years + retireYears):
+        balance *= growth
+        balance -= withdrawal
+        np.maximum(balance, 0.0, out=balance)
+        history[..., t] = balance
+
+    depletionYear = np.full(principal.shape, np.inf)
+    if retireYears:
+        depleted = history[..., years:] <= 0
+        depletionYear = np.where(depleted.any(axis=-1), depleted.argmax(axis=-1) + 1, np.inf)
+    return {
+        "history": history,
+        "accumulation": history[..., :years],
+        "retirement": history[..., years:],
+        "retirement_balance": retirementBalance[()],
+        "optimal_withdrawal": optimal[()],
+        "withdrawal": np.asarray(withdrawal)[()],
+        "final_balance": balance[()],
+        "depletion_year": depletionYear[()],
+    }
+
+
+def parameterSweep(principal, rates, contributions, years, retireYears=None, retireRate=None):
+    """
+    Evaluate fixedInvestor and then maximumExpensed over the Cartesian
+    grid rates x contributions x years (x retireYears) in one broadcast
+    computation. Returns a dict with the axes and 'balance', the final
+    accumulated balance shaped (rates, contributions, years), plus
+    'withdrawal', the optimal annual withdrawal shaped (rates,
+    contributions, years, retireYears), when retireYears is given.
+    Retirement grows at the accumulation rate of each row unless a single
+    retireRate is given.
+    """
+    rates = np.atleast_1d(np.asarray(rates, dtype=np.float64))
+    contributions = np.atleast_1d(np.asarray(contributions, dtype=np.float64))
+    years = np.atleast_1d(np.asarray(years, dtype=np.float64))
+    rateAxis, contributionAxis, yearAxis = np.ix_(rates, contributions, years)
+    balance = np.asarray(fixedFutureValue(principal, rateAxis, yearAxis, contributionAxis))
+    result = {"rates": rates, "contributions": contributions, "years": years, "balance": balance}
+    if retireYears is not None:
+        retireYears = np.atleast_1d(np.asarray(retireYears, dtype=np.float64))
+        retireRate = rateAxis[..., np.newaxis] if retireRate is None else retireRate
+        # The optimal withdrawal is linear in the principal, so the annuity
+        # factors are computed once per (rate, horizon) and scaled.
+        perUnit = np.asarray(maximumExpensed(1.0, retireRate, retireYears))
+        result["retireYears"] = retireYears
+        result["withdrawal"] = balance[..., np.newaxis] * perUnit
+    return result
+
+
+def requiredContribution(principal, rate, years, target):
+    """
+    Annual contribution that makes fixedInvestor reach 'target' after
+    'years', from the closed form: (target - principal * (1 + rate) **
+    years) / annuity factor. Zero when the principal alone gets there; inf
+    when it cannot be reached with no years left. Accepts scalars or
+    broadcastable arrays.
+    """
+    growth, annuity = _growthFactors(rate, years)
+    shortfall = np.asarray(target, dtype=np.float64) - np.asarray(principal, dtype=np.float64) * growth
+    with np.errstate(divide="ignore", invalid="ignore"):
+        contribution = np.where(annuity > 0, shortfall / annuity, np.where(shortfall > 0, np.inf, 0.0))
+    return np.maximum(contribution, 0.0)[()]
+
+
+def contributionForWithdrawal(principal, rate, years, withdrawal, retireYears, retireRate=None):
+    """
+    Annual contribution over 'years' that funds an optimal (maximumExpensed)
+    withdrawal of 'withdrawal' a year for 'retireYears', with retirement
+    growing at retireRate (the accumulation rate if not given).
+    """
+    retireRate = rate if retireRate is None else retireRate
+    target = np.asarray(withdrawal, dtype=np.float64) / maximumExpensed(1.0, retireRate, retireYears)
+    return requiredContribution(principal, rate, years, target)
+
+
+def requiredYears(principal, rate, contribution, target):
+    """
+    Whole years of fixedInvestor needed to reach 'target', from
+    n = log((target * rate + contribution) / (principal * rate + contribution))
+    / log(1 + rate), rounded up. Zero when the principal already meets the
+    target and inf when it is never reached (including at a -100% rate
+    unless one contribution is enough). Accepts scalars or
+    broadcastable arrays.
+    """
+    principal, rate, contribution, target = np.broadcast_arrays(
+        np.asarray(principal, dtype=np.float64),
+        np.asarray(rate, dtype=np.float64),
+        np.asarray(contribution, dtype=np.float64),
+        np.asarray(target, dtype=np.float64),
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = (target * rate + contribution) / (principal * rate + contribution)
+        exact = np.where(rate == 0, (target - principal) / contribution, np.log(ratio) / np.log1p(rate))
+        reachable = (np.isfinite(exact) & (exact >= 0) & (rate > -1)
+                     & np.where(rate == 0, contribution > 0, ratio > 0))
+        years = np.where(reachable, np.ceil(exact), 0.0)
+        # Step back a year where rounding overshot the first year that
+        # reaches the target.
+        previous = np.maximum(years - 1, 0)
+        years -= (years > 0) & (fixedFutureValue(principal, rate, previous, contribution) >= target)
+    years = np.where(reachable, years, np.inf)
+    # At -100% everything is lost each year and only that year's
+    # contribution is left, so the target is met in year one or never.
+    years = np.where(rate == -1, np.where(contribution >= target, 1.0, np.inf), years)
+    return np.where(principal >= target, 0.0, years)[()]
+
+
+def requiredRate(principal, years, contribution, target, tolerance=1e-10, maxIterations=100):
     """
-    low, high = 0, principal
-    for _ in range(100):
-        mid = (low + high) / 2
-        b = principal
-        for _ in range(years):
-            b = b * (1 + rate) - mid
-            if b < 0:
+    Annual rate at which fixedInvestor reaches 'target' after 'years', for
+    non-negative principals and contributions (the balance then grows with
+    the rate). Solved in x = log(1 + rate), where the log of the closed-form
+    balance is close to linear, by a bracketed Newton iteration: a Newton
+    step where it stays inside the bracket, a bisection step otherwise. It
+    starts from the rate that grows principal + contribution * years to the
+    target and stops once every scenario has moved less than 'tolerance'.
+    Returns nan where no rate within RATE_BRACKET reaches the target or the
+    iteration has not converged after 'maxIterations' steps. Accepts
+    scalars or broadcastable arrays.
+    """
+    principal, years, contribution, target = np.broadcast_arrays(
+        np.asarray(principal, dtype=np.float64),
+        np.asarray(years, dtype=np.float64),
+        np.asarray(contribution, dtype=np.float64),
+        np.asarray(target, dtype=np.float64),
+    )
+    low = np.full(principal.shape, np.log1p(RATE_BRACKET[0]))
+    high = np.full(principal.shape, np.log1p(RATE_BRACKET[1]))
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        feasible = ((fixedFutureValue(principal, RATE_BRACKET[0], years, contribution) <= target)
+                    & (fixedFutureValue(principal, RATE_BRACKET[1], years, contribution) >= target))
+        # Compounding the contributions as if all paid up front gives a
+        # closed-form guess within a few steps of the answer.
+        guess = np.log(target / (principal + contribution * years)) / years
+        x = np.clip(np.where(np.isfinite(guess), guess, np.log1p(0.05)), low, high)
+        converged = ~feasible
+        for _ in range(maxIterations):
+            rate = np.expm1(x)
+            growth, annuity = _growthFactors(rate, years)
+            balance = principal * growth + contribution * annuity
+            low = np.where(balance < target, x, low)
+            high = np.where(balance > target, x, high)
+            # d(balance)/d(rate) of principal * g**n + contribution * (g**n - 1) / rate,
+            # with its series limit near a zero rate; d(rate)/dx = 1 + rate.
+            slope = np.where(
+                np.abs(rate) < 1e-6,
+                principal * years + contribution * years * (years - 1) / 2,
+                years * growth / (1 + rate) * (principal + contribution / rate) - contribution * annuity / rate,
+            ) * (1 + rate)
+            # Newton on log(balance) - log(target), nearly linear in x.
+            newton = x - (np.log(balance) - np.log(target)) * balance / slope
+            step = np.where(np.isfinite(newton) & (newton > low) & (newton < high), newton, (low + high) / 2)
+            step = np.where(balance == target, x, step)
+            moved = np.abs(np.expm1(step) - rate)
+            x = np.where(converged, x, step)
+            converged |= moved <= tolerance * (1 + np.abs(rate))
+            if converged.all():
                 break
-        if b > 0:
-            low = mid
+    return np.where(feasible & converged, np.expm1(x), np.nan)[()]
+
+
+def simulateReturns(paths, years, mean, volatility, distribution="normal", seed=None):
+    """
+    Draw a (paths x years) matrix of annual returns with the given mean and
+    volatility. 'normal' samples the rates directly; 'lognormal' samples
+    log(1 + rate) with parameters matched to the same mean and volatility,
+    so a year can never lose more than everything. seed may be anything
+    numpy.random.default_rng accepts, including a Generator.
+    The matrix is stored year-major so each year's column is contiguous.
+    """
+    rng = np.random.default_rng(seed)
+    draws = rng.standard_normal(size=(years, paths)).T
+    if distribution == "normal":
+        draws *= volatility
+        draws += mean
+        return draws
+    if distribution == "lognormal":
+        variance = np.log1p((volatility / (1 + mean)) ** 2)
+        draws *= np.sqrt(variance)
+        draws += np.log1p(mean) - variance / 2
+        return np.expm1(draws, out=draws)
+    raise ValueError(f"Unknown return distribution: {distribution!r}")
+
+
+def _lifecyclePaths(principal, rateMatrix, contribution, years, withdrawal):
+    """
+    Run every row of rateMatrix through 'years' of variableInvestor-style
+    accumulation followed by finallyRetired-style withdrawals for the
+    remaining columns. Returns the (paths x columns) balance history.
+    """
+    history = np.add(rateMatrix, 1.0)  # growth factors, overwritten in place
+    balance = np.full(history.shape[0], principal, dtype=np.float64)
+    for t in range(history.shape[1]):
+        balance *= history[:, t]
+        if t < years:
+            balance += contribution
         else:
-            high = mid
-    return low
+            balance -= withdrawal
+            np.maximum(balance, 0.0, out=balance)
+        history[:, t] = balance
+    return history
+
+
+def _percentileBands(history, percentiles=PERCENTILES):
+    """
+    Linearly interpolated percentiles of every column of history, matching
+    numpy.percentile. Sorts the columns in place.
+    """
+    history.sort(axis=0)
+    position = np.asarray(percentiles, dtype=np.float64) / 100 * (history.shape[0] - 1)
+    lower = np.floor(position).astype(int)
+    upper = np.minimum(lower + 1, history.shape[0] - 1)
+    weight = (position - lower)[:, np.newaxis]
+    bands = history[lower] * (1 - weight) + history[upper] * weight
+    return dict(zip(percentiles, bands))
+
+
+def monteCarlo(principal, contribution, years, withdrawal, retireYears, mean, volatility,
+               paths=10000, distribution="normal", seed=None):
+    """
+    Monte Carlo version of variableInvestor followed by finallyRetired:
+    'paths' random return sequences are accumulated for 'years' with the
+    annual contribution, then drawn down by 'withdrawal' for 'retireYears',
+    all paths at once. Returns a dict with the probability that money is
+    left at the end, the PERCENTILES bands of the balance for every year
+    and the median depletion year (counted from retirement) of the paths
+    that ran out, or None if none did.
+    """
+    rates = simulateReturns(paths, years + retireYears, mean, volatility, distribution, seed)
+    history = _lifecyclePaths(principal, rates, contribution, years, withdrawal)
+    del rates
+    final = history[:, -1] if history.shape[1] else np.full(paths, float(principal))
+    medianDepletion = None
+    if retireYears:
+        retired = history[:, years:] <= 0
+        depleted = retired.any(axis=1)
+        if depleted.any():
+            medianDepletion = float(np.median(retired[depleted].argmax(axis=1) + 1))
+    return {
+        "success_rate": float(np.mean(final > 0)),
+        "percentiles": _percentileBands(history),
+        "median_depletion_year": medianDepletion,
+    }
+
+
+def _criticalWithdrawals(principal, rateMatrix, contribution, years):
+    """
+    For every row of rateMatrix, the withdrawal at which the lifecycle of
+    _lifecyclePaths ends at exactly zero. With growth factors G_t
+    compounded from retirement, the balance after t withdrawals is
+    G_t * (B - w * sum(1 / G_s for s <= t)), so a path keeps money to the
+    end exactly when w < B / sum(1 / G_t), B being the balance at
+    retirement. Paths with a non-positive growth factor in retirement never
+    succeed (-inf); with no retirement years, any positive B succeeds (inf).
+    """
+    paths, columns = rateMatrix.shape
+    balance = np.full(paths, principal, dtype=np.float64)
+    for t in range(years):
+        balance *= 1 + rateMatrix[:, t]
+        balance += contribution
+    if columns == years:
+        return np.where(balance > 0, np.inf, -np.inf)
+    compounded = np.ones(paths)
+    discounted = np.zeros(paths)
+    wipedOut = np.zeros(paths, dtype=bool)
+    for t in range(years, columns):
+        growth = 1 + rateMatrix[:, t]
+        wipedOut |= growth <= 0
+        compounded *= growth
+        with np.errstate(divide="ignore"):
+            discounted += 1 / compounded
+    with np.errstate(divide="ignore", invalid="ignore"):
+        critical = balance / discounted
+    return np.where(wipedOut | ~np.isfinite(critical), -np.inf, critical)
+
+
+def safeWithdrawal(principal, contribution, years, retireYears, mean, volatility, successRate=0.9,
+                   paths=10000, distribution="normal", seed=None):
+    """
+    Largest annual withdrawal that leaves money at the end of retirement in
+    at least 'successRate' of simulated return paths, under the same model
+    as monteCarlo. Success falls as the withdrawal rises, so instead of
+    searching, each path's critical withdrawal (see _criticalWithdrawals)
+    is computed once from a single set of paths and the answer is the
+    matching order statistic, the ceil(successRate * paths)-th largest,
+    lowered by SAFE_WITHDRAWAL_MARGIN. A path succeeds when the withdrawal
+    is below its critical one, so with the same seed both monteCarlo and
+    successProbability report at least successRate at the returned value.
+    successRate may be an array to get several answers from the same paths.
+    Returns -inf if too few paths succeed even without withdrawals.
+    """
+    rates = simulateReturns(paths, years + retireYears, mean, volatility, distribution, seed)
+    critical = _criticalWithdrawals(principal, rates, contribution, years)
+    del rates
+    critical[::-1].sort()
+    rank = np.clip(np.ceil(np.asarray(successRate, dtype=np.float64) * paths).astype(np.int64), 1, paths)
+    chosen = critical[rank - 1]
+    return np.where(chosen > 0, chosen * (1 - SAFE_WITHDRAWAL_MARGIN), -np.inf)[()]
+
+
+def successProbability(principal, contribution, years, withdrawal, retireYears, mean, volatility,
+                       paths=10000, distribution="normal", seed=None):
+    """
+    Share of simulated return paths that keep money to the end of retirement
+    for each candidate 'withdrawal' (a scalar or array), with every
+    candidate evaluated against one set of paths. A path succeeds when the
+    withdrawal is below its critical withdrawal, the exact form of
+    monteCarlo's final balance > 0; the two can only disagree for a
+    candidate within rounding of some path's critical value.
+    """
+    rates = simulateReturns(paths, years + retireYears, mean, volatility, distribution, seed)
+    critical = _criticalWithdrawals(principal, rates, contribution, years)
+    del rates
+    critical.sort()
+    withdrawal = np.asarray(withdrawal, dtype=np.float64)
+    return ((paths - np.searchsorted(critical, withdrawal, side="right")) / paths)[()]
+
+
+def _monteCarloChunk(job):
+    """
+    Simulate one chunk of parallelMonteCarlo and reduce it to mergeable
+    statistics: path and success counts, a histogram of depletion years,
+    a BalanceSketch of every year's balance and its running moments.
+    """
+    (principal, contribution, years, withdrawal, retireYears, mean, volatility,
+     paths, distribution, seed, relativeAccuracy) = job
+    rates = simulateReturns(paths, years + retireYears, mean, volatility, distribution, seed)
+    history = _lifecyclePaths(principal, rates, contribution, years, withdrawal)
+    del rates
+    final = history[:, -1] if history.shape[1] else np.full(paths, float(principal))
+    if retireYears:
+        retired = history[:, years:] <= 0
+        depletionYear = np.where(retired.any(axis=1), retired.argmax(axis=1) + 1, 0)
+    else:
+        depletionYear = np.zeros(paths, dtype=np.int64)
+    sketch = BalanceSketch(history.shape[1], relativeAccuracy)
+    sketch.update(history)
+    moments = RunningMoments(history.shape[1])
+    moments.update(history)
+    return {
+        "successes": int(np.count_nonzero(final > 0)),
+        "depletions": np.bincount(depletionYear, minlength=retireYears + 1),
+        "sketch": sketch,
+        "moments": moments,
+    }
+
+
+def _histogramMedian(counts):
+    """Median of the values 0..len(counts)-1 weighted by counts."""
+    total = counts.sum()
+    cumulative = np.cumsum(counts)
+    low = np.searchsorted(cumulative, (total - 1) // 2, side="right")
+    high = np.searchsorted(cumulative, total // 2, side="right")
+    return (low + high) / 2
+
+
+def parallelMonteCarlo(principal, contribution, years, withdrawal, retireYears, mean, volatility,
+                       paths=1_000_000, distribution="normal", seed=None, chunkSize=50_000, workers=None,
+                       relativeAccuracy=0.002):
+    """
+    monteCarlo for very large path counts, split into chunks of 'chunkSize'
+    paths that run in a ProcessPoolExecutor with 'workers' processes
+    (workers=1 runs them in this process). Every chunk gets its own child
+    of numpy.random.SeedSequence(seed), and chunks are merged in order, so
+    the result depends only on seed and chunkSize, never on the number of
+    workers. Chunks return summary statistics rather than paths and are
+    folded in as they finish, so memory is bounded by the chunk size. The
+    percentile bands come from a BalanceSketch and are within one bucket
+    width (about 2 * 'relativeAccuracy') of the exact values, typically
+    much closer; the result also carries the per-year mean and standard
+    deviation.
+    """
+    sizes = [chunkSize] * (paths // chunkSize) + ([paths % chunkSize] if paths % chunkSize else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = (
+        (principal, contribution, years, withdrawal, retireYears, mean, volatility,
+         size, distribution, chunkSeed, relativeAccuracy)
+        for size, chunkSeed in zip(sizes, seeds)
+    )
+    sketch = BalanceSketch(years + retireYears, relativeAccuracy)
+    moments = RunningMoments(years + retireYears)
+    depletions = np.zeros(retireYears + 1, dtype=np.int64)
+    successes = 0
+    pool = None
+    if workers != 1:
+        # Imported here: concurrent.futures.process is a noticeable share of
+        # CLI startup and only the multi-process path needs it.
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for chunk in (pool.map(_monteCarloChunk, jobs) if pool else map(_monteCarloChunk, jobs)):
+            successes += chunk["successes"]
+            depletions += chunk["depletions"]
+            sketch.merge(chunk["sketch"])
+            moments.merge(chunk["moments"])
+    finally:
+        if pool:
+            pool.shutdown()
+
+    depletions[0] = 0  # bucket 0 holds the paths that never ran out
+    return {
+        "success_rate": successes / paths,
+        "percentiles": sketch.percentiles(PERCENTILES),
+        "median_depletion_year": float(_histogramMedian(depletions)) if depletions.any() else None,
+        "mean": moments.mean,
+        "std": moments.std(),
+    }
+
+
+def streamingMonteCarlo(principal, contribution, years, withdrawal, retireYears, mean, volatility,
+                        paths=1_000_000, distribution="normal", seed=None, blockSize=50_000,
+                        relativeAccuracy=0.002):
+    """
+    parallelMonteCarlo in this process: paths are simulated 'blockSize' at
+    a time and folded into the percentile sketch and running moments, so
+    memory stays bounded by the block size however many paths are run.
+    """
+    return parallelMonteCarlo(principal, contribution, years, withdrawal, retireYears, mean, volatility,
+                              paths, distribution, seed, chunkSize=blockSize, workers=1,
+                              relativeAccuracy=relativeAccuracy)
@@ -0,0 +1,92 @@
+import numpy as np
+
+# Largest spread of cumulative log growth allowed inside one backtest
+# block. Window sums are differences of prefix sums of exp(-L), which lose
+# about eps * exp(spread) of relative precision: e^16 leaves ~1e-8.
+BLOCK_LOG_SPREAD = 16.0
+
+
+def _windowFlows(logGrowth, window, principal, contribution, withdrawal, accumPeriods):
+    """
+    Terminal balance and depletion period of every full window over one
+    stretch of log-growth values. Balances are tracked in start-of-window
+    money: a cash flow after period k is worth exp(-(L[k+1] - L[s])) at the
+    start s, where L is the cumulative log growth, so every window sum is a
+    difference of one prefix sum of exp(-L).
+    """
+    cumulative = np.concatenate([[0.0], np.cumsum(logGrowth)])
+    discount = np.concatenate([[0.0], np.cumsum(np.exp(-cumulative[1:]))])
+    starts = np.arange(len(logGrowth) - window + 1)
+    retire = starts + accumPeriods
+    ends = starts + window
+    scale = np.exp(cumulative[starts])
+
+    atRetirement = principal + contribution * scale * (discount[retire] - discount[starts])
+    terminal = np.exp(cumulative[ends] - cumulative[starts]) * (
+        atRetirement - withdrawal * scale * (discount[ends] - discount[retire])
+    )
+    failed = terminal <= 0
+    depletion = np.full(len(starts), np.inf)
+    if withdrawal > 0 and failed.any():
+        # Discounted withdrawals only grow, so the first period they exceed
+        # the balance at retirement is found by binary search.
+        needed = discount[retire[failed]] + atRetirement[failed] / (withdrawal * scale[failed])
+        depletion[failed] = np.searchsorted(discount, needed, side="left") - starts[failed]
+    return np.where(failed, 0.0, terminal), depletion
+
+
+def backtest(returns, window, principal, contribution=0.0, withdrawal=0.0, accumPeriods=0,
+             periodsPerYear=1, startYear=0, blockSize=4096):
+    """
+    Run a plan against every historical starting point of a return series.
+    Each window of 'window' periods starts with 'principal', adds
+    'contribution' after each of its first 'accumPeriods' periods and takes
+    'withdrawal' after each remaining one, like fixedInvestor followed by
+    finallyRetired. All windows come from cumulative log-returns computed
+    once, so the cost is near-linear in the series length rather than
+    series length x window. The prefix sums lose precision as the
+    cumulative log growth they cover spreads out, so the series is split
+    into blocks of at most 'blockSize' starts that each close once the
+    growth spanned by their windows would exceed BLOCK_LOG_SPREAD (a
+    single window spanning more than that is still run alone, at reduced
+    precision).
+
+    Returns a dict with the terminal balance and depletion period (inf if
+    the money lasts) of every window, the failure rate, and the start years
+    (startYear + start / periodsPerYear) of the worst, median and best
+    windows ranked by terminal balance, then by how early they ran out.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    if not 0 <= accumPeriods <= window <= len(returns):
+        raise ValueError("Need 0 <= accumPeriods <= window <= len(returns)")
+    logGrowth = np.log1p(returns)
+    windows = len(returns) - window + 1
+    terminal = np.empty(windows)
+    depletion = np.empty(windows)
+    cumulative = np.concatenate([[0.0], np.cumsum(logGrowth)])
+    first = 0
+    while first < windows:
+        # The windows starting in [first, last) cover cumulative[first:last + window];
+        # keep the largest 'last' whose spread stays within the limit.
+        reach = cumulative[first:min(first + blockSize, windows) + window]
+        spread = np.maximum.accumulate(reach) - np.minimum.accumulate(reach)
+        last = first + max(int(np.searchsorted(spread[window:], BLOCK_LOG_SPREAD, side="right")), 1)
+        blockTerminal, blockDepletion = _windowFlows(
+            logGrowth[first:last + window - 1], window, principal, contribution, withdrawal, accumPeriods
+        )
+        terminal[first:last] = blockTerminal
+        depletion[first:last] = blockDepletion
+        first = last
+
+    ranked = np.lexsort((depletion, terminal))
+    years = startYear + np.arange(windows) / periodsPerYear
+    if periodsPerYear == 1:
+        years = years.astype(int)
+    return {
+        "terminal": terminal,
+        "depletion_period": depletion,
+        "failure_rate": float(np.mean(np.isfinite(depletion))),
+        "worst": years[ranked[0]],
+        "median": years[ranked[windows // 2]],
+        "best": years[ranked[-1]],
+    }
@@ -0,0 +1,416 @@
+import csv
+import json
+import math
+import os
+import sys
+from contextlib import nullcontext
+from itertools import islice
+
+import numpy as np
+
+from algorithms import (fixedFutureValue, batchVariableInvestor, depletionYears, maximumExpensed,
+                        fixedInvestor, finallyRetired, monteCarlo, requiredContribution,
+                        contributionForWithdrawal, requiredRate, requiredYears)
+
+
+# Scenario kinds understood by run_batch and the result column each fills.
+KINDS = {
+    "fixed": "balance",
+    "variable": "balance",
+    "depletion": "years_to_depletion",
+    "optimal": "withdrawal",
+    "goal_contribution": "required_contribution",
+    "goal_rate": "required_rate",
+    "goal_years": "required_years",
+}
+
+# Inputs each kind needs. A row missing one, or with a value that is not
+# a finite number, is not evaluated; its 'error' column says why.
+REQUIRED_FIELDS = {
+    "fixed": ("principal", "rate", "years"),
+    "variable": ("principal", "rates"),
+    "depletion": ("principal", "withdrawal", "rate"),
+    "optimal": ("principal", "rate", "years"),
+    "goal_contribution": ("principal", "rate", "years"),
+    "goal_rate": ("principal", "years", "target"),
+    "goal_years": ("principal", "rate", "target"),
+}
+
+# Inputs that may be left blank, with the value used instead.
+OPTIONAL_FIELDS = {"contribution": 0.0}
+
+# Inputs rejected when negative.
+NON_NEGATIVE_FIELDS = ("withdrawal", "years", "retire_years")
+
+OUTPUT_FIELDS = ["id", "kind", "balance", "years_to_depletion", "withdrawal",
+                 "required_contribution", "required_rate", "required_years", "error"]
+
+DEFAULT_CHUNK_SIZE = 65536
+
+# Key (never a column name) under which read_scenarios passes on why a
+# line could not be read.
+UNREADABLE = object()
+
+# Retirement years simulated for fan charts of scenarios without retire_years.
+DEFAULT_RETIRE_YEARS = 30
+
+
+def _is_jsonl(path):
+    return os.path.splitext(path)[1].lower() in (".jsonl", ".ndjson")
+
+
+def _open(path, mode):
+    if path == "-":
+        return nullcontext(sys.stdin if "r" in mode else sys.stdout)
+    return open(path, mode, newline="")
+
+
+def read_scenarios(f, jsonl=False):
+    """
+    Yield scenarios as dicts from a CSV file with a header row or from JSON
+    Lines. Each has a 'kind' (see KINDS) and the fields that kind needs:
+    principal, rate, years, contribution, withdrawal, and for 'variable'
+    scenarios a list of rates (';'-separated in CSV). The goal_* kinds solve
+    for the named input given a target balance; goal_contribution can
+    instead target a withdrawal over retire_years (at retire_rate, default
+    the rate).
+    Unreadable JSON lines are yielded as a scenario holding just the reason
+    under the UNREADABLE key, which parse_scenario reports, so one bad line
+    does not end the file.
+    """
+    if jsonl:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as exc:
+                row = {UNREADABLE: f"invalid JSON on line {number}: {exc.msg}"}
+            if not isinstance(row, dict):
+                row = {UNREADABLE: f"line {number} is not a JSON object"}
+            yield row
+    else:
+        yield from csv.DictReader(f)
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _number(row, name):
+    value = row.get(name)
+    if _blank(value):
+        raise ValueError(f"missing {name}")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = math.nan
+    if not math.isfinite(number):
+        raise ValueError(f"invalid {name} {value!r}")
+    return number
+
+
+def _rates(row):
+    rates = row.get("rates")
+    if _blank(rates):
+        raise ValueError("missing rates")
+    if isinstance(rates, str):
+        rates = [r for r in rates.replace(",", ";").split(";") if r.strip()]
+    if not isinstance(rates, list):
+        raise ValueError(f"invalid rates {rates!r}")
+    return [_number({"rates": rate}, "rates") for rate in rates]
+
+
+def parse_scenario(row):
+    """
+    Return (kind, inputs) for one scenario, with every input its kind uses
+    converted to float ('rates' to a list of floats). Raises ValueError
+    naming the problem for an unknown kind, a missing or non-numeric
+    required input or a negative NON_NEGATIVE_FIELDS value;
+    OPTIONAL_FIELDS left blank take their defaults.
+    goal_contribution needs either a 'target' balance or a 'withdrawal'
+    and 'retire_years' (with optional 'retire_rate', default the rate).
+    """
+    if UNREADABLE in row:
+        raise ValueError(row[UNREADABLE])
+    kind = str(row.get("kind") or "").strip().lower()
+    if kind not in KINDS:
+        raise ValueError(f"unknown kind {row.get('kind')!r}")
+    inputs = {}
+    for name in REQUIRED_FIELDS[kind]:
+        inputs[name] = _rates(row) if name == "rates" else _number(row, name)
+    for name, default in OPTIONAL_FIELDS.items():
+        inputs[name] = default if _blank(row.get(name)) else _number(row, name)
+    if kind == "goal_contribution":
+        if not _blank(row.get("target")):
+            inputs["target"] = _number(row, "target")
+        else:
+            inputs["withdrawal"] = _number(row, "withdrawal")
+            inputs["retire_years"] = _number(row, "retire_years")
+            inputs["retire_rate"] = inputs["rate"] if _blank(row.get("retire_rate")) else _number(row, "retire_rate")
+    for name in NON_NEGATIVE_FIELDS:
+        if inputs.get(name, 0.0) < 0:
+            raise ValueError(f"negative {name} {inputs[name]:g}")
+    return kind, inputs
+
+
+def _result_error(field, value):
+    """
+    Why a non-finite planner result cannot be reported. The one that can,
+    an infinite years_to_depletion (the money never runs out), is written
+    blank instead.
+    """
+    if field in ("required_contribution", "required_rate", "required_years"):
+        return "target cannot be reached"
+    if field in ("balance", "withdrawal"):
+        return f"{field} overflows"
+    return f"no {field} for these inputs"
+
+
+def _column(group, name):
+    return np.array([inputs[name] for inputs in group])
+
+
+def evaluate_chunk(rows):
+    """
+    Evaluate a list of scenarios, grouping each kind into one vectorized
+    call, and return a result dict per scenario in input order. Rows that
+    parse_scenario rejects, and results _result_error cannot report, carry
+    an 'error' instead.
+    """
+    results = [
+        {"id": row.get("id", ""), "kind": row.get("kind", "")} for row in rows
+    ]
+    groups = {}
+    for i, row in enumerate(rows):
+        try:
+            kind, inputs = parse_scenario(row)
+        except ValueError as exc:
+            results[i]["error"] = str(exc)
+            continue
+        groups.setdefault(kind, ([], []))
+        groups[kind][0].append(i)
+        groups[kind][1].append(inputs)
+
+    for kind, (indices, group) in groups.items():
+        # Overflow and invalid results are reported per row by _result_error.
+        with np.errstate(all="ignore"):
+            values = _evaluate_group(kind, group)
+        field = KINDS[kind]
+        values = np.atleast_1d(values)
+        reportable = np.isfinite(values)
+        if field == "years_to_depletion":
+            reportable |= values == np.inf
+        for i, value, ok in zip(indices, values.tolist(), reportable.tolist()):
+            if ok:
+                results[i][field] = value
+            else:
+                results[i]["error"] = _result_error(field, value)
+    return results
+
+
+def _evaluate_group(kind, group):
+    """Results for a list of parsed inputs of one kind, from one vectorized call."""
+    if kind == "fixed":
+        values = fixedFutureValue(_column(group, "principal"), _column(group, "rate"),
+                                  _column(group, "years"), _column(group, "contribution"))
+    elif kind == "depletion":
+        values = depletionYears(_column(group, "principal"), _column(group, "withdrawal"),
+                                _column(group, "rate"))
+    elif kind == "optimal":
+        values = maximumExpensed(_column(group, "principal"), _column(group, "rate"),
+                                 _column(group, "years"))
+    elif kind == "goal_contribution":
+        values = np.empty(len(group))
+        targeted = [j for j, inputs in enumerate(group) if "target" in inputs]
+        funded = sorted(set(range(len(group))) - set(targeted))
+        if targeted:
+            subset = [group[j] for j in targeted]
+            values[targeted] = requiredContribution(_column(subset, "principal"), _column(subset, "rate"),
+                                                    _column(subset, "years"), _column(subset, "target"))
+        if funded:
+            subset = [group[j] for j in funded]
+            values[funded] = contributionForWithdrawal(
+                _column(subset, "principal"), _column(subset, "rate"), _column(subset, "years"),
+                _column(subset, "withdrawal"), _column(subset, "retire_years"), _column(subset, "retire_rate"))
+    elif kind == "goal_rate":
+        values = requiredRate(_column(group, "principal"), _column(group, "years"),
+                              _column(group, "contribution"), _column(group, "target"))
+    elif kind == "goal_years":
+        values = requiredYears(_column(group, "principal"), _column(group, "rate"),
+                               _column(group, "contribution"), _column(group, "target"))
+    else:
+        values = np.empty(len(group))
+        by_length = {}
+        for j, inputs in enumerate(group):
+            by_length.setdefault(len(inputs["rates"]), []).append(j)
+        for length, members in by_length.items():
+            same_length = [group[j] for j in members]
+            values[members], _ = batchVariableInvestor(
+                _column(same_length, "principal"),
+                np.array([inputs["rates"] for inputs in same_length]).reshape(len(members), length),
+                _column(same_length, "contribution"),
+            )
+    return values
+
+
+def _format_csv(result):
+    row = dict(result)
+    for field in ("balance", "withdrawal", "required_contribution"):
+        if field in row:
+            row[field] = f"{row[field]:.2f}"
+    if "required_rate" in row:
+        row["required_rate"] = f"{row['required_rate']:.6f}"
+    for field in ("years_to_depletion", "required_years"):
+        if field in row:
+            years = row[field]
+            row[field] = "" if years == np.inf else int(years)
+    return row
+
+
+def _format_json(result):
+    row = {}
+    for field, value in result.items():
+        if field in ("years_to_depletion", "required_years"):
+            value = None if value == np.inf else int(value)
+        elif field in ("balance", "withdrawal", "required_contribution"):
+            value = round(float(value), 2)
+        elif field == "required_rate":
+            value = round(float(value), 6)
+        row[field] = value
+    return json.dumps(row)
+
+
+def run_batch(input_path, output_path="-", chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream scenarios from input_path (CSV, or JSON Lines for .jsonl and
+    .ndjson) through the planners 'chunk_size' rows at a time and append
+    the results to output_path as each chunk finishes, so memory stays
+    constant however many rows there are. '-' reads stdin / writes stdout.
+    A scenario that cannot be evaluated gets an 'error' column (key in
+    JSONL) and the run carries on. Returns (scenarios processed, scenarios
+    rejected).
+    """
+    count = rejected = 0
+    with _open(input_path, "r") as source, _open(output_path, "w") as sink:
+        scenarios = read_scenarios(source, _is_jsonl(input_path))
+        if _is_jsonl(output_path):
+            def write(results):
+                sink.writelines(_format_json(result) + "\n" for result in results)
+        else:
+            writer = csv.DictWriter(sink, fieldnames=OUTPUT_FIELDS)
+            writer.writeheader()
+
+            def write(results):
+                writer.writerows(_format_csv(result) for result in results)
+        while True:
+            rows = list(islice(scenarios, chunk_size))
+            if not rows:
+                break
+            results = evaluate_chunk(rows)
+            write(results)
+            count += len(rows)
+            rejected += sum("error" in result for result in results)
+    return count, rejected
+
+
+# Optional inputs of a chart scenario, beside the principal, rate and
+# years it needs, with the values used when left blank (None: not set).
+CHART_FIELDS = {"contribution": 0.0, "withdrawal": 0.0, "retire_years": None, "retire_rate": None,
+                "mean": None, "volatility": None, "paths": 10000}
+
+
+def parse_chart_scenario(row):
+    """
+    Return the inputs of one run_charts scenario as numbers, with
+    CHART_FIELDS defaults filled in. Raises ValueError naming the problem,
+    as parse_scenario does, for an unreadable line, a missing or
+    non-numeric principal, rate or years, or a negative or otherwise
+    invalid value.
+    """
+    if UNREADABLE in row:
+        raise ValueError(row[UNREADABLE])
+    inputs = {name: _number(row, name) for name in ("principal", "rate", "years")}
+    for name, default in CHART_FIELDS.items():
+        inputs[name] = default if _blank(row.get(name)) else _number(row, name)
+    for name in NON_NEGATIVE_FIELDS + ("volatility",):
+        if (inputs[name] or 0.0) < 0:
+            raise ValueError(f"negative {name} {inputs[name]:g}")
+    if inputs["paths"] < 1:
+        raise ValueError(f"invalid paths {inputs['paths']:g}")
+    return inputs
+
+
+def _chart_jobs(inputs, name, directory, fmt):
+    years = int(inputs["years"])
+    retire_years = None if inputs["retire_years"] is None else int(inputs["retire_years"])
+    retire_rate = inputs["rate"] if inputs["retire_rate"] is None else inputs["retire_rate"]
+    _, accum_history = fixedInvestor(inputs["principal"], inputs["rate"], years, inputs["contribution"])
+    _, retire_history = finallyRetired(accum_history[-1] if accum_history else inputs["principal"],
+                                       inputs["withdrawal"], retire_rate, retire_years)
+    jobs = [("timeline", {"accum_history": accum_history, "retire_history": retire_history,
+                          "path": os.path.join(directory, f"{name}.{fmt}"), "title": f"Scenario {name}"})]
+    if inputs["volatility"] is not None:
+        result = monteCarlo(inputs["principal"], inputs["contribution"], years, inputs["withdrawal"],
+                            retire_years or DEFAULT_RETIRE_YEARS,
+                            inputs["rate"] if inputs["mean"] is None else inputs["mean"],
+                            inputs["volatility"], paths=int(inputs["paths"]))
+        jobs.append(("fan", {"percentiles": result["percentiles"], "accum_years": years,
+                             "path": os.path.join(directory, f"{name}-fan.{fmt}"),
+                             "title": f"Scenario {name}: {result['success_rate']:.1%} success"}))
+    return jobs
+
+
+def _scenario_charts(job):
+    """
+    Simulate one scenario and draw its charts, returning the written paths.
+    Runs in a run_charts worker, so the Monte Carlo behind a fan chart is
+    parallel along with the drawing.
+    """
+    from visualize import CHARTS
+
+    inputs, name, directory, fmt = job
+    return [CHARTS[kind](**kwargs) for kind, kwargs in _chart_jobs(inputs, name, directory, fmt)]
+
+
+def run_charts(input_path, directory, fmt="png", workers=None, chunk_size=256):
+    """
+    Render a timeline chart, named after the scenario id, into 'directory'
+    for every scenario in input_path, plus a Monte Carlo fan chart for those
+    with a 'volatility' (and optionally 'mean' and 'paths'). Scenarios use
+    principal, rate, years, contribution and withdrawal, with optional
+    retire_years and retire_rate for the retirement phase; without
+    retire_years the timeline runs until depletion and the fan chart covers
+    DEFAULT_RETIRE_YEARS. Each scenario is simulated and drawn in one of
+    'workers' processes (workers=1 runs them here), from a single pool
+    kept for the whole run and fed 'chunk_size' scenarios at a time.
+    Scenarios that parse_chart_scenario rejects are skipped.
+    Returns (charts written, [(scenario id, error) for each skipped one]).
+    """
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    rejected = []
+    pool = None
+    if workers != 1:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        with _open(input_path, "r") as source:
+            scenarios = enumerate(read_scenarios(source, _is_jsonl(input_path)), 1)
+            while True:
+                chunk = list(islice(scenarios, chunk_size))
+                if not chunk:
+                    break
+                jobs = []
+                for index, row in chunk:
+                    name = str(row.get("id") or index)
+                    try:
+                        jobs.append((parse_chart_scenario(row), name, directory, fmt))
+                    except ValueError as exc:
+                        rejected.append((name, str(exc)))
+                for paths in (pool.map(_scenario_charts, jobs) if pool else map(_scenario_charts, jobs)):
+                    count += len(paths)
+    finally:
+        if pool:
+            pool.shutdown()
+    return count, rejected
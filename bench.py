@@ -0,0 +1,270 @@
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import algorithms
+from visualize import plot_balance_text
+
+
+# Years simulated by the horizon benchmarks and scenarios per call in the
+# batch benchmarks; --max-size trims both.
+HORIZONS = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+BATCH_SIZES = (1, 100, 10_000, 1_000_000)
+
+# A result slower than baseline * (1 + threshold) counts as a regression.
+DEFAULT_THRESHOLD = 0.10
+
+# Shared inputs. The rate is small enough that million-year horizons stay
+# within float range, and retirement withdrawals are sized with
+# maximumExpensed so depletion lands at the end of the horizon.
+PRINCIPAL = 100_000.0
+RATE = 1e-5
+CONTRIBUTION = 1_000.0
+BATCH_YEARS = 30
+
+
+def _fixed_investor(years):
+    return lambda: algorithms.fixedInvestor(PRINCIPAL, RATE, years, CONTRIBUTION)
+
+
+def _variable_investor(years):
+    rates = np.random.default_rng(0).normal(RATE, 0.01, years).tolist()
+    return lambda: algorithms.variableInvestor(PRINCIPAL, rates, CONTRIBUTION)
+
+
+def _finally_retired_years(years):
+    withdrawal = algorithms.maximumExpensed(PRINCIPAL, RATE, years)
+    return lambda: algorithms.finallyRetired(PRINCIPAL, withdrawal, RATE, years=years)
+
+
+def _finally_retired_depletion(years):
+    withdrawal = algorithms.maximumExpensed(PRINCIPAL, RATE, years) * 1.0001
+    return lambda: algorithms.finallyRetired(PRINCIPAL, withdrawal, RATE, horizon=years)
+
+
+def _maximum_expensed(years):
+    return lambda: algorithms.maximumExpensed(PRINCIPAL, RATE, years)
+
+
+def _plot_balance_text(years):
+    _, accum_history = algorithms.fixedInvestor(PRINCIPAL, RATE, years // 2, CONTRIBUTION)
+    withdrawal = algorithms.maximumExpensed(accum_history[-1], RATE, years - years // 2)
+    _, retire_history = algorithms.finallyRetired(accum_history[-1], withdrawal, RATE, years=years - years // 2)
+    return lambda: plot_balance_text(accum_history, retire_history, width=100, file=io.StringIO())
+
+
+def _batch_inputs(size):
+    rng = np.random.default_rng(0)
+    return (rng.uniform(0, 1e6, size), rng.uniform(-0.02, 0.10, size),
+            rng.integers(1, 60, size).astype(np.float64), rng.uniform(0, 1e4, size))
+
+
+def _batch_fixed_investor(size):
+    principals, rates, years, contributions = _batch_inputs(size)
+    return lambda: algorithms.batchFixedInvestor(principals, rates, years, contributions)
+
+
+def _batch_variable_investor(size):
+    principals, _, _, contributions = _batch_inputs(size)
+    rate_matrix = np.random.default_rng(1).normal(0.05, 0.1, (size, BATCH_YEARS))
+    return lambda: algorithms.batchVariableInvestor(principals, rate_matrix, contributions)
+
+
+def _batch_depletion_years(size):
+    principals, rates, _, withdrawals = _batch_inputs(size)
+    return lambda: algorithms.depletionYears(principals, withdrawals * 10, rates)
+
+
+def _batch_maximum_expensed(size):
+    principals, rates, years, _ = _batch_inputs(size)
+    return lambda: algorithms.maximumExpensed(principals, rates, years)
+
+
+# name -> (setup(size) returning a zero-argument callable, sizes, unit)
+BENCHMARKS = {
+    "fixedInvestor": (_fixed_investor, HORIZONS, "years"),
+    "variableInvestor": (_variable_investor, HORIZONS, "years"),
+    "finallyRetired[years]": (_finally_retired_years, HORIZONS, "years"),
+    "finallyRetired[depletion]": (_finally_retired_depletion, HORIZONS, "years"),
+    "maximumExpensed": (_maximum_expensed, HORIZONS, "years"),
+    "plot_balance_text": (_plot_balance_text, HORIZONS, "years"),
+    "batchFixedInvestor": (_batch_fixed_investor, BATCH_SIZES, "scenarios"),
+    "batchVariableInvestor": (_batch_variable_investor, BATCH_SIZES, "scenarios"),
+    "depletionYears": (_batch_depletion_years, BATCH_SIZES, "scenarios"),
+    "maximumExpensed[batch]": (_batch_maximum_expensed, BATCH_SIZES, "scenarios"),
+}
+
+
+def measure(func, min_time=0.2, max_repeat=1000):
+    """
+    Time func() repeatedly for at least 'min_time' seconds (and at least
+    once) and return (best seconds per call, peak bytes allocated during
+    one traced call).
+    """
+    best = float("inf")
+    total = 0.0
+    repeat = 0
+    while repeat < max_repeat and (repeat == 0 or total < min_time):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = min(best, elapsed)
+        total += elapsed
+        repeat += 1
+
+    # Memory is traced on a separate call so tracing overhead stays out of
+    # the timings.
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run_benchmarks(names=None, max_size=None, min_time=0.2, log=None):
+    """Run the selected BENCHMARKS and return one result dict per (name, size)."""
+    results = []
+    for name, (setup, sizes, unit) in BENCHMARKS.items():
+        if names and not any(selected in name for selected in names):
+            continue
+        for size in sizes:
+            if max_size and size > max_size:
+                continue
+            seconds, peak = measure(setup(size), min_time)
+            result = {
+                "name": name, "size": size, "unit": unit, "seconds": seconds,
+                "throughput": size / seconds if seconds else float("inf"), "peak_bytes": peak,
+            }
+            results.append(result)
+            if log:
+                log(result)
+    return results
+
+
+def _import_breakdown(stderr, top=6):
+    """(module, milliseconds) for the slowest direct imports of cli_modern, from -X importtime output."""
+    children = []
+    for line in stderr.splitlines():
+        _, _, fields = line.partition("import time:")
+        parts = fields.split("|")
+        if len(parts) == 3 and parts[2].startswith("   ") and not parts[2].startswith("    "):
+            try:
+                children.append((parts[2].strip(), int(parts[1]) / 1000))
+            except ValueError:
+                continue
+    return sorted(children, key=lambda child: child[1], reverse=True)[:top]
+
+
+def measure_startup(runs=10, log=None):
+    """
+    Cold-start cli_modern 'runs' times in fresh interpreters: once just
+    importing it and once running a one-scenario batch as a shell script
+    would. Returns result dicts like run_benchmarks (best wall time, size 1)
+    and logs the slowest direct imports seen by -X importtime.
+    """
+    cli = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli_modern.py")
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        scenarios = os.path.join(directory, "scenario.csv")
+        with open(scenarios, "w") as f:
+            f.write("id,kind,principal,rate,years,contribution\n1,fixed,1000,0.05,10,100\n")
+        commands = {
+            "startup[import]": [sys.executable, "-X", "importtime", "-c", "import cli_modern"],
+            "startup[batch]": [sys.executable, cli, "batch", scenarios, "-o", os.devnull],
+        }
+        for name, command in commands.items():
+            best = float("inf")
+            for _ in range(runs):
+                started = time.perf_counter()
+                finished = subprocess.run(command, cwd=os.path.dirname(cli), capture_output=True, text=True, check=True)
+                best = min(best, time.perf_counter() - started)
+            result = {"name": name, "size": 1, "unit": "runs", "seconds": best,
+                      "throughput": 1 / best, "peak_bytes": 0}
+            results.append(result)
+            if log:
+                log(result)
+                if name == "startup[import]":
+                    for module, milliseconds in _import_breakdown(finished.stderr):
+                        print(f"    {module:<23} {milliseconds:>8.1f} ms import")
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Match results against a baseline report by (name, size) and return the
+    regressions: dicts with both timings and their ratio, for every case
+    that got slower than baseline * (1 + threshold).
+    """
+    previous = {(r["name"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result["name"], result["size"]))
+        if before is None or not before["seconds"]:
+            continue
+        ratio = result["seconds"] / before["seconds"]
+        if ratio > 1 + threshold:
+            regressions.append({"name": result["name"], "size": result["size"], "baseline": before["seconds"],
+                                "seconds": result["seconds"], "ratio": ratio})
+    return regressions
+
+
+def _format_result(result):
+    return (f"{result['name']:<27} {result['size']:>9,} {result['unit']:<9} "
+            f"{result['seconds'] * 1000:>11.3f} ms {result['throughput']:>14,.0f}/s "
+            f"{result['peak_bytes'] / 2**20:>9.2f} MiB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the RetirePlan planners and text chart")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="JSON report to write")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown before a case counts as a regression (0.10 = 10%%)")
+    parser.add_argument("--max-size", type=int, help="skip horizons and batch sizes above this")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds spent timing each case")
+    parser.add_argument("-k", "--select", action="append", help="only run benchmarks whose name contains this")
+    parser.add_argument("--startup", type=int, metavar="RUNS", default=0,
+                        help="also time RUNS cold starts of cli_modern (e.g. with -k startup)")
+    args = parser.parse_args(argv)
+
+    print(f"{'benchmark':<27} {'size':>9} {'unit':<9} {'best':>14} {'throughput':>16} {'peak':>13}")
+    results = run_benchmarks(args.select, args.max_size, args.min_time,
+                             log=lambda result: print(_format_result(result), flush=True))
+    if args.startup:
+        results += measure_startup(args.startup, log=lambda result: print(_format_result(result), flush=True))
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {len(results)} results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression['name']} size {regression['size']:,}: "
+                  f"{regression['baseline'] * 1000:.3f} ms -> {regression['seconds'] * 1000:.3f} ms "
+                  f"({regression['ratio']:.2f}x)")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} of {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import json
+import math
+import sqlite3
+from collections import OrderedDict
+
+import algorithms
+from history import BalanceHistory
+
+
+def _optimal_retirement(principal, rate, years):
+    result = algorithms.lifecycle(principal, 0.0, 0, 0.0, years, retireRate=rate)
+    history = BalanceHistory()
+    history.frombytes(result["retirement"].tobytes())
+    return result["withdrawal"], history
+
+
+class ScenarioCache:
+    """
+    Memoize the planners in algorithms.py for repeated advisor scenarios.
+    Keys are built from the function name and its inputs rounded to
+    'ndigits' decimal places, so 0.05 and 0.0500000001 (or 100 and 100.0)
+    share an entry.
+    At most 'maxsize' results stay in memory, least recently used first
+    out; with 'path' set they are also persisted in a SQLite database and
+    survive restarts. Histories are kept as BalanceHistory (packed float64)
+    and each caller gets its own copy.
+    """
+
+    def __init__(self, maxsize=1024, path=None, ndigits=6):
+        self.maxsize = maxsize
+        self.ndigits = ndigits
+        self.entries = OrderedDict()
+        self.hits = self.misses = self.disk_hits = self.evictions = 0
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value REAL, history BLOB)"
+            )
+
+    def _normalize(self, value):
+        if hasattr(value, "tolist"):
+            value = value.tolist()
+        if isinstance(value, (list, tuple)):
+            return [self._normalize(v) for v in value]
+        if value is None:
+            return value
+        return round(float(value), self.ndigits)
+
+    def _key(self, name, args):
+        return json.dumps([name, [self._normalize(arg) for arg in args]])
+
+    def _store(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(self, name, func, *args):
+        """
+        Return func(*args) from the cache if an equivalent call was seen,
+        otherwise compute and remember it. func returns a number or a
+        (number, history) pair.
+        """
+        key = self._key(name, args)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        elif self.db is not None and (row := self.db.execute(
+                "SELECT value, history FROM results WHERE key = ?", (key,)).fetchone()):
+            self.disk_hits += 1
+            value, blob = row
+            history = None
+            if blob is not None:
+                history = BalanceHistory()
+                history.frombytes(blob)
+            entry = (value, history)
+            self._store(key, entry)
+        else:
+            self.misses += 1
+            result = func(*args)
+            if isinstance(result, tuple):
+                value, history = result
+                history = BalanceHistory(history)
+            else:
+                value, history = result, None
+            entry = (float(value), history)
+            self._store(key, entry)
+            if self.db is not None:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                    (key, entry[0], None if history is None else history.tobytes()),
+                )
+                self.db.commit()
+
+        value, history = entry
+        if history is None:
+            return value
+        if name == "finallyRetired" and math.isfinite(value):
+            value = int(value)  # a year count
+        return value, history.copy()
+
+    def fixedInvestor(self, principal, rate, years, contribution):
+        return self.get_or_compute("fixedInvestor", algorithms.fixedInvestor, principal, rate, years, contribution)
+
+    def variableInvestor(self, principal, rateList, contribution):
+        return self.get_or_compute("variableInvestor", algorithms.variableInvestor, principal, rateList, contribution)
+
+    def finallyRetired(self, principal, withdrawal, rate, years=None):
+        return self.get_or_compute("finallyRetired", algorithms.finallyRetired, principal, withdrawal, rate, years)
+
+    def maximumExpensed(self, principal, rate, years):
+        return self.get_or_compute("maximumExpensed", algorithms.maximumExpensed, principal, rate, years)
+
+    def optimalRetirement(self, principal, rate, years):
+        """The optimal withdrawal and the retirement history it produces, from one lifecycle pass."""
+        return self.get_or_compute("optimalRetirement", _optimal_retirement, principal, rate, years)
+
+    def stats(self):
+        """Hit, miss and eviction counts plus the current in-memory size."""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        """Drop the in-memory entries; the on-disk store is kept."""
+        self.entries.clear()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
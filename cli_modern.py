@@ -1,37 +1,146 @@
-from rich.console import Console
-from rich.panel import Panel
-from rich.table import Table
-from rich.text import Text
-from rich import box
-from rich.prompt import Prompt
+import argparse
+import math
+import os
+import re
+import sys
+from contextlib import nullcontext
+import numpy as np
 from utils import validate_float, validate_int, format_currency_jmd
-from algorithms import fixedInvestor, variableInvestor, finallyRetired, maximumExpensed
+from algorithms import monteCarlo, streamingMonteCarlo, parameterSweep, safeWithdrawal
+from cache import ScenarioCache
+from incremental import IncrementalInvestor
+from instrument import profiler, enable as enable_profiling
 from visualize import plot_balance_text
+from series import loadReturns
 
-console = Console()
+# Steps either side of the entered rate and contribution in the what-if grid.
+SWEEP_STEPS = 3
+
+# Success probability the Monte Carlo safe withdrawal is solved for, and the
+# most paths used to solve it (the paths are held in memory at once).
+TARGET_SUCCESS = 0.90
+SAFE_WITHDRAWAL_PATHS = 100_000
+
+# Monte Carlo runs with up to this many paths keep every path in memory and
+# report exact percentile bands; larger runs stream through a sketch.
+EXACT_PERCENTILE_PATHS = 50_000
+
+# Heatmap cell styles from the lowest to the highest value.
+HEATMAP_STYLES = ("red", "dark_orange", "yellow", "green_yellow", "green")
+
+# Style of heatmap cells whose value overflowed to inf (or nan).
+OVERFLOW_STYLE = "magenta"
+
+# Rich is imported on first render, so scripted runs that never draw
+# anything (batch, charts) skip it. --plain replaces it altogether.
+PLAIN = False
+
+MARKUP = re.compile(r"\[/?[a-z][a-z0-9 _#.,=-]*\]")
+
+
+class LazyConsole:
+    """Import Rich and create the real console the first time it is used"""
+
+    def __getattr__(self, name):
+        global console
+        from rich.console import Console
+        console = Console()
+        return getattr(console, name)
+
+
+class PlainConsole:
+    """Console stand-in for --plain: prints text with Rich markup removed"""
+
+    def print(self, *objects, end="\n", **kwargs):
+        print(*(MARKUP.sub("", str(obj)) for obj in objects), end=end, flush=True)
+
+    def status(self, message, **kwargs):
+        self.print(message)
+        return nullcontext()
+
+
+class PlainTable:
+    """The subset of rich.table.Table the menus use, rendered as aligned text"""
+
+    def __init__(self, title=None, show_header=True, **kwargs):
+        self.title = title
+        self.show_header = show_header
+        self.columns = []
+        self.rows = []
+
+    @property
+    def row_count(self):
+        return len(self.rows)
+
+    def add_column(self, header="", **kwargs):
+        self.columns.append((header, kwargs.get("justify", "left")))
+
+    def add_row(self, *cells, **kwargs):
+        self.rows.append([MARKUP.sub("", str(cell)) for cell in cells])
+
+    def __str__(self):
+        rows = ([[header for header, _ in self.columns]] if self.show_header else []) + self.rows
+        widths = [max(len(row[i]) for row in rows) for i in range(len(self.columns))]
+        lines = [self.title] if self.title else []
+        for row in rows:
+            cells = [cell.rjust(width) if justify == "right" else cell.ljust(width)
+                     for cell, width, (_, justify) in zip(row, widths, self.columns)]
+            lines.append("  ".join(cells).rstrip())
+        return "\n".join(lines)
+
+
+def make_table(box="ROUNDED", **kwargs):
+    """A Rich table, or a PlainTable with --plain; box is a rich.box name"""
+    if PLAIN:
+        return PlainTable(**kwargs)
+    from rich import box as boxes
+    from rich.table import Table
+    return Table(box=getattr(boxes, box), **kwargs)
+
+
+def print_panel(body, title=None, border_style="blue", box="ROUNDED", padding=(0, 1)):
+    """Print 'body' in a Rich panel, or as plain text under its title with --plain"""
+    if PLAIN:
+        if title:
+            console.print(title)
+        console.print(body)
+        return
+    from rich import box as boxes
+    from rich.panel import Panel
+    console.print(Panel(body, title=title, border_style=border_style, box=getattr(boxes, box), padding=padding))
+
+
+console = LazyConsole()
+
+# Repeated advisor scenarios are answered from here; set RETIREPLAN_CACHE
+# to a file path to keep results between sessions.
+planner_cache = ScenarioCache(path=os.environ.get("RETIREPLAN_CACHE"))
 
 def print_header():
     """Display the application header with branding"""
-    header = Text()
-    header.append("RetirePlan", style="bold cyan")
-    header.append(" Pro", style="bold magenta")
-    
-    panel = Panel(
-        Text("Your Personal Retirement Planning Assistant", style="italic white", justify="center"),
-        title=header,
-        border_style="cyan",
-        box=box.DOUBLE,
-        padding=(1, 2)
-    )
     console.print()
-    console.print(panel)
+    if PLAIN:
+        console.print("RetirePlan Pro - Your Personal Retirement Planning Assistant")
+    else:
+        from rich.text import Text
+        header = Text()
+        header.append("RetirePlan", style="bold cyan")
+        header.append(" Pro", style="bold magenta")
+
+        print_panel(
+            Text("Your Personal Retirement Planning Assistant", style="italic white", justify="center"),
+            title=header,
+            border_style="cyan",
+            box="DOUBLE",
+            padding=(1, 2)
+        )
     console.print()
 
 def print_menu():
     """Display the main menu with styled options"""
-    table = Table(
+    table = make_table(
         show_header=False,
-        box=box.ROUNDED,
+        box="ROUNDED",
         border_style="blue",
         padding=(0, 2)
     )
@@ -44,59 +153,72 @@ def print_menu():
     table.add_row("3", "⏳ Years Until Depletion")
     table.add_row("4", "🎯 Optimal Withdrawal Amount")
     table.add_row("5", "📈 Visualize Balance Timeline")
+    table.add_row("6", "🎲 Monte Carlo Risk Analysis")
+    table.add_row("7", "🧮 What-If Sensitivity Grid")
+    table.add_row("8", "⏱️  Performance Stats")
     table.add_row("", "")
     table.add_row("E", "🚪 Exit", style="dim")
     table.add_row("C", "🗑️  Clear All Data", style="dim")
     
-    console.print(Panel(table, title="[bold white]Main Menu[/bold white]", border_style="blue", box=box.ROUNDED))
+    print_panel(table, title="[bold white]Main Menu[/bold white]", border_style="blue", box="ROUNDED")
     console.print()
 
 def print_result(label, value):
     """Display calculation results in a styled panel"""
-    result_text = Text()
-    result_text.append(f"{label}\n", style="bold cyan")
-    result_text.append(value, style="bold green")
+    if PLAIN:
+        result_text = f"{label}\n{value}"
+    else:
+        from rich.text import Text
+        result_text = Text()
+        result_text.append(f"{label}\n", style="bold cyan")
+        result_text.append(value, style="bold green")
     
     console.print()
-    console.print(Panel(
+    print_panel(
         result_text,
         title="[bold green]✓ Result[/bold green]",
         border_style="green",
-        box=box.HEAVY,
+        box="HEAVY",
         padding=(1, 2)
-    ))
+    )
     console.print()
 
 def print_error(message):
     """Display error messages in a styled panel"""
     console.print()
-    console.print(Panel(
+    print_panel(
         f"[bold yellow]{message}[/bold yellow]",
         title="[bold red]⚠ Warning[/bold red]",
         border_style="red",
-        box=box.ROUNDED
-    ))
+        box="ROUNDED"
+    )
     console.print()
 
 def print_exit():
     """Display goodbye message"""
     console.print()
-    console.print(Panel(
+    print_panel(
         "[bold cyan]Thank you for using RetirePlan Pro![/bold cyan]\n[white]Plan wisely, retire comfortably. 🌴[/white]",
         border_style="cyan",
-        box=box.DOUBLE
-    ))
+        box="DOUBLE"
+    )
+    stats = planner_cache.stats()
+    if stats["hits"] + stats["disk_hits"] + stats["misses"]:
+        console.print(
+            f"[dim]Scenario cache: {stats['hits'] + stats['disk_hits']} hits, "
+            f"{stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)[/dim]"
+        )
     console.print()
 
 def print_cleared():
     """Display data cleared message"""
     console.print()
-    console.print(Panel(
+    print_panel(
         "[bold yellow]All data has been cleared.[/bold yellow]\n[white]Starting fresh...[/white]",
         title="[bold orange1]🗑️  Data Reset[/bold orange1]",
         border_style="yellow",
-        box=box.ROUNDED
-    ))
+        box="ROUNDED"
+    )
     console.print()
 
 def print_navigation_help():
@@ -108,6 +230,115 @@ def styled_input(prompt_text, style="cyan"):
     console.print(f"[{style}]➤[/{style}] [bold white]{prompt_text}[/bold white]", end=" ")
     return input().strip()
 
+def prompt_fields(fields, accum_history, retire_history):
+    """
+    Ask for each (key, prompt, validator, min_val) field in turn with the
+    usual navigation keys. Returns the answers as a dict, or 'e', 'c' or 'b'
+    when the user exits, clears the data or goes back to the menu.
+    """
+    values = {}
+    step = 0
+    while step < len(fields):
+        key, prompt, validator, min_val = fields[step]
+        value = validator(prompt, min_val)
+        if value == 'e':
+            print_exit()
+            return 'e'
+        elif value == 'c':
+            accum_history.clear()
+            retire_history.clear()
+            print_cleared()
+            return 'c'
+        elif value == 'b':
+            return 'b'
+        elif value == 'p':
+            if step == 0:
+                console.print("[dim]Already at first step[/dim]\n")
+            else:
+                step -= 1
+            continue
+        values[key] = value
+        step += 1
+    return values
+
+def print_percentile_table(percentiles, accum_years, max_rows=20):
+    """Display per-year percentile bands, sampling long horizons down to max_rows"""
+    bands = list(percentiles.items())
+    total = len(bands[0][1])
+    step = max(1, math.ceil(total / max_rows))
+    rows = sorted(set(range(step - 1, total, step)) | {total - 1})
+
+    table = make_table(box="ROUNDED", border_style="blue", title="[bold white]Balance Percentiles[/bold white]")
+    table.add_column("Year", style="cyan bold", justify="right")
+    for percentile, _ in bands:
+        table.add_column("Median" if percentile == 50 else f"P{percentile}", justify="right",
+                         style="bold green" if percentile == 50 else "white")
+    for t in rows:
+        label = f"{t + 1}" if t < accum_years else f"{t + 1} ▓"
+        table.add_row(label, *(format_currency_jmd(band[t]) for _, band in bands))
+
+    console.print(table)
+    console.print("[dim]▓ = retirement (withdrawal) years[/dim]\n")
+
+def print_heatmap(title, grid, rates, contributions, base=(None, None)):
+    """Display a rates x contributions grid shaded from low (red) to high (green); --plain stars the base cell"""
+    finite = grid[np.isfinite(grid)]
+    low, high = (float(finite.min()), float(finite.max())) if finite.size else (0.0, 0.0)
+    span = (high - low) or 1.0
+    table = make_table(box="ROUNDED", border_style="blue", title=f"[bold white]{title}[/bold white]")
+    table.add_column("Rate \\ Contribution", style="cyan bold", justify="right")
+    for contribution in contributions:
+        table.add_column(format_currency_jmd(contribution), justify="right")
+    for i, rate in enumerate(rates):
+        cells = []
+        for j, value in enumerate(grid[i]):
+            if math.isfinite(value):
+                style = HEATMAP_STYLES[min(int((value - low) / span * len(HEATMAP_STYLES)), len(HEATMAP_STYLES) - 1)]
+                text = format_currency_jmd(value)
+            else:
+                style, text = OVERFLOW_STYLE, "overflow"
+            if (i, j) == base:
+                style += " bold reverse"
+                if PLAIN:
+                    text = f"*{text}"
+            cells.append(f"[{style}]{text}[/{style}]")
+        table.add_row(f"{rate:.2%}", *cells)
+    console.print(table)
+
+def print_stats():
+    """Display planner profiling data and scenario cache counters"""
+    if profiler.active:
+        table = make_table(box="ROUNDED", border_style="blue", title="[bold white]Planner Profile[/bold white]")
+        table.add_column("Function", style="cyan bold")
+        for heading in ("Calls", "Total ms", "Own ms", "Mean ms", "Iterations", "Returned"):
+            table.add_column(heading, justify="right")
+        for row in profiler.stats():
+            table.add_row(
+                row["function"], f"{row['calls']:,}", f"{row['seconds'] * 1000:,.2f}",
+                f"{row['own_seconds'] * 1000:,.2f}", f"{row['seconds'] * 1000 / row['calls']:,.3f}",
+                f"{row['iterations']:,}", f"{row['bytes'] / 1024:,.1f} KiB",
+            )
+        if not table.row_count:
+            table.add_row("[dim]No planner calls yet[/dim]", *[""] * 6)
+        console.print(table)
+    else:
+        console.print("[dim]Profiling is off. Start with --profile or RETIREPLAN_PROFILE=1 to record planner timings.[/dim]")
+
+    stats = planner_cache.stats()
+    cache_table = make_table(box="ROUNDED", border_style="blue", title="[bold white]Scenario Cache[/bold white]")
+    for heading in ("Hits", "Disk hits", "Misses", "Evictions", "Entries", "Hit rate"):
+        cache_table.add_column(heading, justify="right")
+    cache_table.add_row(str(stats["hits"]), str(stats["disk_hits"]), str(stats["misses"]),
+                        str(stats["evictions"]), str(stats["size"]), f"{stats['hit_rate']:.0%}")
+    console.print(cache_table)
+    console.print()
+
+    if profiler.active:
+        path = styled_input("Save profile to (.json or .prof, Enter to skip):")
+        if path:
+            profiler.dump(path)
+            console.print(f"[green]Profile saved to {path}[/green]\n")
+
 def main():
     print_header()
     accum_history = []
@@ -277,7 +508,7 @@ def main():
             if contribution in ['c', 'b']:
                 continue
             
-            balance, accum_history = fixedInvestor(principal, rate, years, contribution)
+            balance, accum_history = planner_cache.fixedInvestor(principal, rate, years, contribution)
             print_result("Accumulated Balance", format_currency_jmd(balance))
 
         # ----------------- Variable Growth -----------------
@@ -307,8 +538,38 @@ def main():
             if principal in ['c', 'b']:
                 continue
             
+            # Optional: read the rates from a return-series file
+            rate_file = styled_input("📂 Rate file (.npy, .csv or raw float64), or Enter to type rates:")
+            if rate_file.lower() == 'e':
+                print_exit()
+                return
+            elif rate_file.lower() == 'c':
+                accum_history.clear()
+                retire_history.clear()
+                print_cleared()
+                continue
+            elif rate_file.lower() == 'b':
+                continue
+
+            rateList = []
+            if rate_file and rate_file.lower() != 'p':
+                try:
+                    series = loadReturns(rate_file)
+                except (OSError, ValueError) as exc:
+                    print_error(f"Could not load rate file: {exc}")
+                    continue
+                if series.ndim > 1:
+                    series = series[:, 0]
+                rateList = series.tolist()
+                if not rateList:
+                    print_error("The rate file is empty.")
+                    continue
+                console.print(f"[dim]Loaded {len(rateList):,} yearly rates from {rate_file}[/dim]\n")
+            num_years = len(rateList)
+            r = None
+
             # Step 2: Number of years
-            while True:
+            while not rateList:
                 num_years = validate_int("🕒 Number of years: ", 1)
                 if num_years == 'e':
                     print_exit()
@@ -344,9 +605,9 @@ def main():
                 continue
             
             # Step 3: Rate list with proper previous navigation
-            console.print(f"\n[bold yellow]Enter growth rate for each year:[/bold yellow]\n")
-            rateList = []
-            current_year = 0
+            current_year = len(rateList)
+            if current_year < num_years:
+                console.print(f"\n[bold yellow]Enter growth rate for each year:[/bold yellow]\n")
             
             while current_year < num_years:
                 r = validate_float(f"📊 Year {current_year+1} growth rate (e.g. 0.05 = 5%): ")
@@ -425,8 +686,43 @@ def main():
             if contribution in ['c', 'b']:
                 continue
             
-            balance, accum_history = variableInvestor(principal, rateList, contribution)
-            print_result("Accumulated Balance", format_currency_jmd(balance))
+            investor = IncrementalInvestor(principal, contribution, rateList)
+            print_result("Accumulated Balance", format_currency_jmd(investor.balance))
+
+            # Step 5: What-if edits, each answered in O(1) by the incremental engine
+            edited = False
+            while True:
+                year = styled_input(f"✏️  Edit a year's rate (1-{len(investor)}), or Enter to finish:").lower()
+                if year in ['', 'b', 'p']:
+                    break
+                elif year == 'e':
+                    print_exit()
+                    return
+                elif year == 'c':
+                    break
+                if not year.isdigit() or not 1 <= int(year) <= len(investor):
+                    print_error(f"Enter a year between 1 and {len(investor)}.")
+                    continue
+                year = int(year)
+                r = validate_float(f"📊 Year {year} growth rate (now {investor.rate(year - 1):.2%}): ")
+                if r == 'e':
+                    print_exit()
+                    return
+                elif r in ['c', 'p']:
+                    year = r
+                    break
+                balance = investor.setRate(year - 1, r)
+                edited = True
+                console.print(f"[green]Year {year} → {r:.2%}: balance {format_currency_jmd(balance)}[/green]\n")
+
+            if year == 'c':
+                accum_history.clear()
+                retire_history.clear()
+                print_cleared()
+                continue
+            accum_history = investor.history()
+            if edited:
+                print_result("Accumulated Balance (edited)", format_currency_jmd(investor.balance))
 
         # ----------------- Years Until Depletion -----------------
         elif choice == "3":
@@ -495,9 +791,12 @@ def main():
             if expense in ['c', 'b'] or rate in ['c', 'b']:
                 continue
             
-            years, history = finallyRetired(accum_history[-1], expense, rate)
+            years, history = planner_cache.finallyRetired(accum_history[-1], expense, rate)
             retire_history["custom"] = history
-            print_result("Years Until Depletion", f"{years} years")
+            if years == math.inf:
+                print_result("Years Until Depletion", "Never — the withdrawal is sustainable")
+            else:
+                print_result("Years Until Depletion", f"{years:,} years")
 
         # ----------------- Optimal Withdrawal -----------------
         elif choice == "4":
@@ -566,9 +865,8 @@ def main():
             if retirement_years in ['c', 'b'] or rate in ['c', 'b']:
                 continue
             
-            optimal = maximumExpensed(accum_history[-1], rate, retirement_years)
+            optimal, history = planner_cache.optimalRetirement(accum_history[-1], rate, retirement_years)
             print_result("Optimal Annual Withdrawal 🎯", format_currency_jmd(optimal))
-            years, history = finallyRetired(accum_history[-1], optimal, rate, years=retirement_years)
             retire_history["optimal"] = history
 
         # ----------------- Visualization -----------------
@@ -597,7 +895,7 @@ def main():
                     console.print("\n[bold cyan]═══ Choose Visualization ═══[/bold cyan]\n")
                     print_navigation_help()
                     
-                    viz_table = Table(show_header=False, box=box.ROUNDED, border_style="blue", padding=(0, 2))
+                    viz_table = make_table(show_header=False, box="ROUNDED", border_style="blue", padding=(0, 2))
                     viz_table.add_column("Option", style="cyan bold", width=8)
                     viz_table.add_column("Description", style="white")
                     
@@ -638,8 +936,135 @@ def main():
                         break
                     else:
                         print_error("Invalid option. Please try again.")
+        # ----------------- Monte Carlo -----------------
+        elif choice == "6":
+            console.print("\n[bold cyan]═══ Monte Carlo Risk Analysis ═══[/bold cyan]\n")
+            print_navigation_help()
+
+            answers = prompt_fields([
+                ("principal", "💰 Initial principal: ", validate_float, 0),
+                ("mean", "📈 Expected annual return (e.g. 0.06 = 6%): ", validate_float, -0.99),
+                ("volatility", "🌪️  Annual volatility (e.g. 0.12 = 12%): ", validate_float, 0),
+                ("years", "🕒 Years until retirement: ", validate_int, 0),
+                ("contribution", "💵 Annual contribution: ", validate_float, 0),
+                ("withdrawal", "💸 Annual withdrawal in retirement: ", validate_float, 0),
+                ("retire_years", "⏳ Expected retirement duration (years): ", validate_int, 1),
+                ("paths", "🎲 Number of simulated paths (e.g. 100000): ", validate_int, 1),
+            ], accum_history, retire_history)
+            if answers == 'e':
+                return
+            elif answers in ['c', 'b']:
+                continue
+
+            with console.status("[cyan]Simulating return paths...[/cyan]"):
+                simulate = monteCarlo if answers["paths"] <= EXACT_PERCENTILE_PATHS else streamingMonteCarlo
+                result = simulate(
+                    answers["principal"], answers["contribution"], answers["years"],
+                    answers["withdrawal"], answers["retire_years"], answers["mean"],
+                    answers["volatility"], paths=answers["paths"],
+                )
+                safe = safeWithdrawal(
+                    answers["principal"], answers["contribution"], answers["years"],
+                    answers["retire_years"], answers["mean"], answers["volatility"],
+                    successRate=TARGET_SUCCESS, paths=min(answers["paths"], SAFE_WITHDRAWAL_PATHS),
+                )
+
+            summary = f"{result['success_rate']:.1%} of paths never run out"
+            if result["median_depletion_year"] is not None:
+                summary += f"\nMedian depletion: year {result['median_depletion_year']:g} of retirement"
+            if safe > 0:
+                summary += f"\nWithdrawal that succeeds in {TARGET_SUCCESS:.0%} of paths: {format_currency_jmd(safe)}"
+            else:
+                summary += f"\nNo withdrawal succeeds in {TARGET_SUCCESS:.0%} of paths"
+            print_result("Probability of Success 🎲", summary)
+            print_percentile_table(result["percentiles"], answers["years"])
+
+        # ----------------- What-If Sensitivity Grid -----------------
+        elif choice == "7":
+            console.print("\n[bold cyan]═══ What-If Sensitivity Grid ═══[/bold cyan]\n")
+            print_navigation_help()
+            answers = prompt_fields([
+                ("principal", "💰 Initial principal: ", validate_float, 0),
+                ("rate", "📈 Expected annual growth rate (e.g. 0.05 = 5%): ", validate_float, -0.99),
+                ("rate_step", "↕️  Rate step between rows (e.g. 0.01 = 1%): ", validate_float, 0),
+                ("contribution", "💵 Annual contribution: ", validate_float, 0),
+                ("contribution_step", "↔️  Contribution step between columns (e.g. 10000): ", validate_float, 0),
+                ("years", "🕒 Years until retirement: ", validate_int, 0),
+                ("retire_years", "⏳ Expected retirement duration (years): ", validate_int, 1),
+                ("retire_rate", "📉 Post-retirement growth rate (e.g. 0.03): ", validate_float, -0.99),
+            ], accum_history, retire_history)
+            if answers == 'e':
+                return
+            elif answers in ['c', 'b']:
+                continue
+
+            offsets = range(-SWEEP_STEPS, SWEEP_STEPS + 1)
+            rates = sorted({answers["rate"] + k * answers["rate_step"] for k in offsets
+                            if answers["rate"] + k * answers["rate_step"] > -1})
+            contributions = sorted({answers["contribution"] + k * answers["contribution_step"] for k in offsets
+                                    if answers["contribution"] + k * answers["contribution_step"] >= 0})
+            sweep = parameterSweep(answers["principal"], rates, contributions, answers["years"],
+                                   retireYears=answers["retire_years"], retireRate=answers["retire_rate"])
+            base = (rates.index(answers["rate"]), contributions.index(answers["contribution"]))
+            console.print()
+            print_heatmap(f"Balance after {answers['years']} years", sweep["balance"][:, :, 0],
+                          rates, contributions, base)
+            print_heatmap(f"Optimal withdrawal over {answers['retire_years']} years",
+                          sweep["withdrawal"][:, :, 0, 0], rates, contributions, base)
+            console.print("[dim]* = your inputs[/dim]\n" if PLAIN else "[dim]Highlighted cell = your inputs[/dim]\n")
+
+        # ----------------- Performance Stats -----------------
+        elif choice == "8":
+            print_stats()
         else:
             print_error("Invalid choice. Please select a valid option.")
 
+def run_cli(argv=None):
+    """Dispatch command-line arguments: no command starts the interactive menu"""
+    parser = argparse.ArgumentParser(prog="cli_modern.py", description="RetirePlan Pro retirement planner")
+    parser.add_argument("--plain", action="store_true", help="plain text output without Rich styling")
+    parser.add_argument("--profile", action="store_true", help="record planner timings (see menu option 8)")
+    parser.add_argument("--profile-output", metavar="PATH",
+                        help="save the profile on exit: JSON for .json, otherwise pstats format")
+    commands = parser.add_subparsers(dest="command")
+    batch_parser = commands.add_parser("batch", help="evaluate scenarios from a CSV or JSONL file without prompts")
+    batch_parser.add_argument("input", help="scenario file (.csv, .jsonl or '-' for stdin)")
+    batch_parser.add_argument("-o", "--output", default="-", help="results file (.csv or .jsonl, default stdout)")
+    batch_parser.add_argument("--chunk-size", type=int, default=65536, help="scenarios evaluated per vectorized chunk")
+    charts_parser = commands.add_parser("charts", help="export timeline and Monte Carlo fan charts for each scenario")
+    charts_parser.add_argument("input", help="scenario file (.csv, .jsonl or '-' for stdin)")
+    charts_parser.add_argument("-d", "--directory", default="charts", help="output directory (default ./charts)")
+    charts_parser.add_argument("--format", choices=["png", "svg"], default="png", help="image format")
+    charts_parser.add_argument("--workers", type=int, default=None, help="rendering processes (default: one per CPU)")
+    global PLAIN, console
+    args = parser.parse_args(argv)
+    if args.plain:
+        PLAIN = True
+        console = PlainConsole()
+    if args.profile or args.profile_output:
+        enable_profiling()
+
+    status = 0
+    if args.command == "batch":
+        from batch import run_batch
+        count, rejected = run_batch(args.input, args.output, args.chunk_size)
+        if rejected:
+            print(f"{rejected} of {count} scenario(s) rejected; see the error column", file=sys.stderr)
+            status = 1
+    elif args.command == "charts":
+        from batch import run_charts
+        count, rejected = run_charts(args.input, args.directory, args.format, args.workers)
+        console.print(f"[green]Wrote {count} chart(s) to {args.directory}[/green]")
+        for name, error in rejected:
+            print(f"Skipped scenario {name}: {error}", file=sys.stderr)
+        if rejected:
+            status = 1
+    else:
+        main()
+    if args.profile_output:
+        profiler.dump(args.profile_output)
+    if status:
+        sys.exit(status)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run_cli()
\ No newline at end of file
@@ -0,0 +1,84 @@
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, chain
+
+
+def _fromBytes(data):
+    history = BalanceHistory()
+    history.frombytes(data)
+    return history
+
+
+class BalanceHistory(array):
+    """
+    Year-by-year balances packed as C doubles: 8 bytes per year instead of
+    a list's pointer plus boxed float. Supports the list operations the
+    planners and CLI use (append, indexing, slicing, len, clear) and the
+    buffer protocol, so numpy.frombuffer(history) reads it without a copy.
+    """
+
+    def __new__(cls, values=()):
+        return super().__new__(cls, "d", values)
+
+    def __getitem__(self, index):
+        item = super().__getitem__(index)
+        if isinstance(index, slice):
+            history = BalanceHistory()
+            history.extend(item)
+            return history
+        return item
+
+    def clear(self):
+        del self[:]
+
+    def copy(self):
+        history = BalanceHistory()
+        history.extend(self)
+        return history
+
+    def __reduce__(self):
+        return _fromBytes, (self.tobytes(),)
+
+    def __repr__(self):
+        return f"BalanceHistory({self.tolist()!r})"
+
+
+class Timeline:
+    """
+    Read-only chain of history segments, such as the accumulation and
+    retirement phases, that behaves like one sequence without copying them
+    into a new list. Segments may be any sequences of balances; each is
+    available by name through phase().
+    """
+
+    def __init__(self, *segments, names=("accumulation", "retirement")):
+        self.segments = segments
+        self.names = names[:len(segments)]
+        self.ends = list(accumulate(len(segment) for segment in segments))
+
+    def __len__(self):
+        return self.ends[-1] if self.ends else 0
+
+    def __iter__(self):
+        return chain.from_iterable(self.segments)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Timeline index out of range")
+        segment = bisect_right(self.ends, index)
+        start = self.ends[segment - 1] if segment else 0
+        return self.segments[segment][index - start]
+
+    def phase(self, name):
+        """The segment registered under 'name'."""
+        return self.segments[self.names.index(name)]
+
+    def phase_index(self, index):
+        """Which segment (0, 1, ...) the year at 'index' belongs to."""
+        return bisect_right(self.ends, index)
+
+    def max(self, default=None):
+        peaks = [max(segment) for segment in self.segments if len(segment)]
+        return max(peaks) if peaks else default
@@ -0,0 +1,147 @@
+import math
+from array import array
+
+import numpy as np
+
+from algorithms import variableInvestor
+
+
+# Years of stale prefix balances rebuilt per vectorized step. Growth is
+# compounded afresh in every block, keeping the products well conditioned.
+REBUILD_BLOCK = 4096
+
+
+class IncrementalInvestor:
+    """
+    variableInvestor whose yearly rates can be edited in place.
+    Keeps the balance after every year (prefix balances) and, for every
+    year k, the product of the growth factors of the years after it
+    (suffix products). Changing year k's growth from g to g' moves the
+    final balance by balance[k - 1] * (g' - g) * suffix[k]; the prefix
+    balances after k and the suffix products before k are only marked
+    stale and recomputed, as far as needed, when next read. An edit at or
+    between the years of earlier edits is O(1); one further away first
+    rebuilds the stale range, O(distance from the last edit), in vectorized
+    blocks of REBUILD_BLOCK years rather than a per-year Python loop.
+    Years are counted from 0.
+    """
+
+    def __init__(self, principal, contribution, rates=()):
+        self.principal = float(principal)
+        self.contribution = float(contribution)
+        rates = np.asarray(rates, dtype=np.float64)
+        self.growth = array("d", (1 + rates).tobytes())
+        self.final, self.balances = variableInvestor(self.principal, rates.tolist(), self.contribution)
+        self.final = float(self.final)
+        self.suffix = array("d", bytes(8 * len(self.growth)))
+        if len(self.growth):
+            suffix = np.frombuffer(self.suffix)
+            suffix[-1] = 1.0
+            with np.errstate(over="ignore"):
+                suffix[:-1] = np.cumprod(np.frombuffer(self.growth)[:0:-1])[::-1]
+        # balances[:clean] and suffix[suffixFrom:] are current.
+        self.clean = len(self.growth)
+        self.suffixFrom = 0
+
+    def __len__(self):
+        return len(self.growth)
+
+    @property
+    def balance(self):
+        """Final balance after the last year."""
+        return self.final
+
+    def rate(self, year):
+        return self.growth[year] - 1
+
+    def _rollForward(self, start, stop):
+        """
+        Recompute balances[start:stop] from the balance before 'start'. Each
+        block is solved in discounted money, B_t = G_t * (B_0 + c * sum(1 / G_s)),
+        G being the growth compounded since the block start; a block that
+        overflows or hits a zero growth factor is rolled year by year.
+        """
+        balance = self.balances[start - 1] if start else self.principal
+        growth = np.frombuffer(self.growth)
+        balances = np.frombuffer(self.balances)
+        for first in range(start, stop, REBUILD_BLOCK):
+            last = min(first + REBUILD_BLOCK, stop)
+            with np.errstate(all="ignore"):
+                compounded = np.cumprod(growth[first:last])
+                block = compounded * (balance + self.contribution * np.cumsum(1 / compounded))
+            if np.isfinite(block).all():
+                balances[first:last] = block
+                balance = block[-1]
+                continue
+            balance = float(balance)
+            for t in range(first, last):
+                balance = balance * self.growth[t] + self.contribution
+                balances[t] = balance
+        return float(balance)
+
+    def _balanceAt(self, year):
+        """Balance after 'year', bringing stale prefix balances up to date."""
+        if year < 0:
+            return self.principal
+        if year >= self.clean:
+            balance = self._rollForward(self.clean, year + 1)
+            self.clean = year + 1
+            if self.clean == len(self.growth):
+                self.final = balance
+        return self.balances[year]
+
+    def _suffixAt(self, year):
+        """Growth product of the years after 'year', recomputing stale ones."""
+        if year < self.suffixFrom:
+            suffix = np.frombuffer(self.suffix)
+            growth = np.frombuffer(self.growth)
+            with np.errstate(over="ignore"):
+                products = np.cumprod(growth[self.suffixFrom:year:-1])[::-1]
+                suffix[year:self.suffixFrom] = suffix[self.suffixFrom] * products
+            self.suffixFrom = year
+        return self.suffix[year]
+
+    def append(self, rate):
+        """Add a year at the end; returns the new final balance."""
+        previous = self._balanceAt(len(self.growth) - 1)
+        growth = 1 + rate
+        self.growth.append(growth)
+        self.balances.append(previous * growth + self.contribution)
+        # Every earlier suffix product now includes this year.
+        self.suffix.append(1.0)
+        self.suffixFrom = len(self.growth) - 1
+        self.clean = len(self.growth)
+        self.final = self.balances[-1]
+        return self.final
+
+    def pop(self):
+        """Remove the last year; returns the new final balance."""
+        self.growth.pop()
+        self.balances.pop()
+        self.suffix.pop()
+        self.clean = min(self.clean, len(self.growth))
+        if self.suffix:
+            self.suffix[-1] = 1.0
+        self.suffixFrom = len(self.growth) - 1 if self.growth else 0
+        self.final = self._balanceAt(len(self.growth) - 1)
+        return self.final
+
+    def setRate(self, year, rate):
+        """Change one year's rate; returns the new final balance."""
+        growth = 1 + rate
+        change = growth - self.growth[year]
+        if not change:
+            return self.final
+        self.final += self._balanceAt(year - 1) * change * self._suffixAt(year)
+        self.growth[year] = growth
+        self.clean = min(self.clean, year)
+        self.suffixFrom = max(self.suffixFrom, year)
+        if not math.isfinite(self.final):
+            # Overflowing products: fall back to rolling the balance forward.
+            self._balanceAt(len(self.growth) - 1)
+        return self.final
+
+    def history(self):
+        """Balance after every year, as a BalanceHistory."""
+        self._balanceAt(len(self.growth) - 1)
+        return self.balances.copy()
@@ -0,0 +1,182 @@
+import inspect
+import json
+import marshal
+import os
+import sys
+import time
+from functools import wraps
+
+import algorithms
+
+
+# Set to any non-empty value (e.g. RETIREPLAN_PROFILE=1) to instrument the
+# planners from startup.
+ENV_VAR = "RETIREPLAN_PROFILE"
+
+_here = os.path.dirname(os.path.abspath(__file__))
+
+
+def _iterations(result):
+    """Years or scenarios a planner worked through, read off its result."""
+    if isinstance(result, tuple) and len(result) == 2 and hasattr(result[1], "__len__"):
+        return len(result[1])
+    if isinstance(result, dict):
+        # lifecycle keeps its years on the last axis of 'history'; the Monte
+        # Carlo planners have one percentile band entry per year.
+        history = result.get("history")
+        if history is not None and getattr(history, "ndim", 0):
+            return int(history.shape[-1])
+        bands = result.get("percentiles")
+        if bands:
+            return len(next(iter(bands.values())))
+        return 1
+    size = getattr(result, "size", None)
+    if size is not None and getattr(result, "ndim", 0):
+        return int(size)
+    return 1
+
+
+def _allocated(result):
+    """Bytes held by the arrays and histories a planner returned."""
+    if isinstance(result, tuple):
+        return sum(_allocated(item) for item in result)
+    if isinstance(result, dict):
+        return sum(_allocated(item) for item in result.values())
+    nbytes = getattr(result, "nbytes", None)
+    if nbytes is not None:
+        return int(nbytes)
+    if hasattr(result, "itemsize") and hasattr(result, "__len__"):
+        return result.itemsize * len(result)
+    return 0
+
+
+class Profiler:
+    """
+    Per-function call counts, wall time (total and excluding instrumented
+    callees), iterations and bytes returned, gathered by the wrappers that
+    install() puts around the public functions of algorithms.py.
+    Iterations are the years or scenarios a call produced: the history
+    length for finallyRetired, the investors and lifecycle, the years
+    simulated by the Monte Carlo planners, the array size for the batch
+    planners, one for a scalar closed form.
+    """
+
+    def __init__(self):
+        self.records = {}
+        self.stack = []
+        self.originals = {}
+
+    def wrap(self, func):
+        code = func.__code__
+        key = (code.co_filename, code.co_firstlineno, func.__name__)
+        record = self.records.setdefault(key, {"calls": 0, "seconds": 0.0, "own_seconds": 0.0,
+                                               "iterations": 0, "bytes": 0})
+        stack = self.stack
+
+        @wraps(func)
+        def instrumented(*args, **kwargs):
+            stack.append(0.0)
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                record["calls"] += 1
+                record["seconds"] += elapsed
+                record["own_seconds"] += elapsed - children
+            record["iterations"] += _iterations(result)
+            record["bytes"] += _allocated(result)
+            return result
+
+        instrumented.__wrapped__ = func
+        return instrumented
+
+    def install(self, module=algorithms):
+        """
+        Replace the public functions of 'module' with instrumented wrappers,
+        here and in any of this project's modules that imported them by
+        name. Generator functions are left alone; their callers are timed.
+        """
+        if self.originals:
+            return
+        for name, func in vars(module).items():
+            if (inspect.isfunction(func) and not name.startswith("_") and func.__module__ == module.__name__
+                    and not inspect.isgeneratorfunction(func)):
+                self.originals[func] = self.wrap(func)
+        for loaded in list(sys.modules.values()):
+            path = getattr(loaded, "__file__", None)
+            if not path or os.path.dirname(os.path.abspath(path)) != _here:
+                continue
+            for name, value in list(vars(loaded).items()):
+                if inspect.isfunction(value) and value in self.originals:
+                    setattr(loaded, name, self.originals[value])
+
+    def uninstall(self):
+        """Put the original functions back."""
+        wrapped = {wrapper: func for func, wrapper in self.originals.items()}
+        for loaded in list(sys.modules.values()):
+            path = getattr(loaded, "__file__", None)
+            if not path or os.path.dirname(os.path.abspath(path)) != _here:
+                continue
+            for name, value in list(vars(loaded).items()):
+                if inspect.isfunction(value) and value in wrapped:
+                    setattr(loaded, name, wrapped[value])
+        self.originals.clear()
+
+    @property
+    def active(self):
+        return bool(self.originals)
+
+    def reset(self):
+        for record in self.records.values():
+            record.update(calls=0, seconds=0.0, own_seconds=0.0, iterations=0, bytes=0)
+
+    def stats(self):
+        """One dict per function that has been called, slowest first."""
+        rows = [
+            {"function": name, "file": os.path.basename(filename), "line": line, **record}
+            for (filename, line, name), record in self.records.items() if record["calls"]
+        ]
+        return sorted(rows, key=lambda row: row["seconds"], reverse=True)
+
+    def dump_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.stats(), f, indent=2)
+
+    def dump_stats(self, path):
+        """
+        Write a pstats-compatible profile (the marshalled dict cProfile
+        saves), readable with pstats.Stats(path) or snakeviz.
+        """
+        entries = {
+            key: (record["calls"], record["calls"], record["own_seconds"], record["seconds"], {})
+            for key, record in self.records.items() if record["calls"]
+        }
+        with open(path, "wb") as f:
+            marshal.dump(entries, f)
+
+    def dump(self, path):
+        """Save as JSON for a .json path, otherwise in pstats format."""
+        if path.lower().endswith(".json"):
+            self.dump_json(path)
+        else:
+            self.dump_stats(path)
+
+
+profiler = Profiler()
+
+
+def enable():
+    """Start instrumenting algorithms.py; nothing is wrapped until this runs."""
+    profiler.install()
+
+
+def disable():
+    profiler.uninstall()
+
+
+if os.environ.get(ENV_VAR):
+    enable()
@@ -0,0 +1,117 @@
+import numpy as np
+
+
+def simulateAssetReturns(portfolios, periods, means, covariance, seed=None):
+    """
+    Draw correlated per-asset returns shaped (portfolios x periods x
+    assets) from a multivariate normal with the given per-period mean
+    vector and covariance matrix. The array is stored period-major, so each
+    period's (portfolios x assets) slice is contiguous for simulatePortfolio.
+    """
+    means = np.asarray(means, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    draws = rng.multivariate_normal(means, covariance, size=(periods, portfolios), method="cholesky")
+    return draws.transpose(1, 0, 2)
+
+
+def _perPeriod(value, portfolios, periods):
+    """
+    Broadcast an amount to (portfolios x periods): a scalar applies to every
+    period, a 1-D array is a schedule shared by all portfolios, and a 2-D
+    array gives each portfolio its own (use shape (portfolios, 1) for a
+    per-portfolio constant).
+    """
+    value = np.asarray(value, dtype=np.float64)
+    if value.ndim == 1:
+        value = value[np.newaxis, :]
+    return np.broadcast_to(value, (portfolios, periods))
+
+
+def _weights(weights, portfolios, assets):
+    weights = np.broadcast_to(np.asarray(weights, dtype=np.float64), (portfolios, assets))
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+def simulatePortfolio(holdings, returns, contributions=0.0, contributionWeights=None, withdrawals=0.0,
+                      withdrawalOrder=None, targetWeights=None, rebalanceEvery=0, keep_history=False):
+    """
+    Run many multi-asset portfolios through the same sequence of periods.
+    holdings is the starting amount in each asset, (assets,) or
+    (portfolios x assets). returns is (periods x assets), shared by every
+    portfolio, or (portfolios x periods x assets), e.g. from
+    simulateAssetReturns. Each period, all portfolios at once:
+
+    1. every holding grows by its asset's return;
+    2. the contribution is split across assets by contributionWeights
+       (default: targetWeights, else equally);
+    3. the withdrawal is taken from the assets in withdrawalOrder (default:
+       their index order), each emptied before the next is touched, by
+       clipping the cumulative holdings in that order;
+    4. every 'rebalanceEvery' periods the holdings are reset to
+       targetWeights of the total.
+
+    contributions and withdrawals are amounts per period: a scalar, a
+    per-period schedule (periods,) or per portfolio (portfolios x periods).
+    The number of portfolios comes from whichever arguments are per
+    portfolio, so e.g. 1-D holdings and shared returns with (portfolios x 1)
+    contributions run that many portfolios.
+    Returns a dict with the 'final' holdings, their 'total', the
+    'depletion_period' in which a withdrawal first could not be met in full
+    (inf if never), the total 'shortfall' and, with keep_history, the
+    (portfolios x assets x periods) 'history' of holdings.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    holdings = np.asarray(holdings, dtype=np.float64)
+    shared = returns.ndim == 2
+    periods, assets = returns.shape[-2:]
+    contributions = np.asarray(contributions, dtype=np.float64)
+    withdrawals = np.asarray(withdrawals, dtype=np.float64)
+    # Any 2-D argument (or 3-D returns) may be the one that sets the
+    # portfolio count; the rest must broadcast against it.
+    (portfolios,) = np.broadcast_shapes(
+        (1,), returns.shape[:-2],
+        *(np.shape(value)[:1] for value in (holdings, contributions, withdrawals, contributionWeights, targetWeights)
+          if value is not None and np.ndim(value) == 2),
+    )
+    holdings = np.broadcast_to(holdings, (portfolios, assets)).copy()
+
+    contributions = _perPeriod(contributions, portfolios, periods)
+    withdrawals = _perPeriod(withdrawals, portfolios, periods)
+    if targetWeights is not None:
+        targetWeights = _weights(targetWeights, portfolios, assets)
+    if contributionWeights is None:
+        contributionWeights = targetWeights if targetWeights is not None else np.ones(assets)
+    contributionWeights = _weights(contributionWeights, portfolios, assets)
+    order = np.arange(assets) if withdrawalOrder is None else np.asarray(withdrawalOrder)
+
+    history = np.empty((portfolios, assets, periods)) if keep_history else None
+    depletion = np.full(portfolios, np.inf)
+    shortfall = np.zeros(portfolios)
+    for t in range(periods):
+        holdings *= 1 + (returns[t] if shared else returns[:, t])
+        np.maximum(holdings, 0.0, out=holdings)
+        holdings += contributions[:, t, np.newaxis] * contributionWeights
+
+        wanted = withdrawals[:, t]
+        if wanted.any():
+            ordered = holdings[:, order]
+            taken = np.minimum(np.cumsum(ordered, axis=1), wanted[:, np.newaxis])
+            taken[:, 1:] -= taken[:, :-1].copy()
+            holdings[:, order] = ordered - taken
+            missing = wanted - taken.sum(axis=1)
+            short = missing > 1e-9 * np.maximum(wanted, 1.0)
+            shortfall += np.where(short, missing, 0.0)
+            depletion = np.where(short & (depletion == np.inf), t + 1, depletion)
+
+        if rebalanceEvery and targetWeights is not None and (t + 1) % rebalanceEvery == 0:
+            holdings = holdings.sum(axis=1, keepdims=True) * targetWeights
+        if history is not None:
+            history[:, :, t] = holdings
+
+    return {
+        "final": holdings,
+        "total": holdings.sum(axis=1),
+        "depletion_period": depletion,
+        "shortfall": shortfall,
+        "history": history,
+    }
@@ -0,0 +1,160 @@
+import numpy as np
+
+
+class _LogStore:
+    """
+    Dense per-year counts of positive values in logarithmic buckets: value x
+    falls in bucket ceil(log(x) / log(gamma)). The bucket range grows on
+    demand, so memory depends on the spread of the values, not their number.
+    """
+
+    def __init__(self, years, logGamma):
+        self.logGamma = logGamma
+        self.offset = 0
+        self.counts = np.zeros((years, 0), dtype=np.int64)
+
+    def _reserve(self, low, high):
+        if self.counts.shape[1] == 0:
+            self.offset = low
+            self.counts = np.zeros((self.counts.shape[0], high - low + 1), dtype=np.int64)
+            return
+        top = self.offset + self.counts.shape[1] - 1
+        before = max(self.offset - low, 0)
+        after = max(high - top, 0)
+        if before or after:
+            self.counts = np.pad(self.counts, ((0, 0), (before, after)))
+            self.offset -= before
+
+    def add(self, years, keys):
+        """Count one value per (year, key) pair."""
+        if keys.size == 0:
+            return
+        self._reserve(int(keys.min()), int(keys.max()))
+        width = self.counts.shape[1]
+        flat = years * width + (keys - self.offset)
+        self.counts += np.bincount(flat, minlength=self.counts.size).reshape(self.counts.shape)
+
+    def merge(self, other):
+        if other.counts.shape[1] == 0:
+            return
+        low = other.offset
+        self._reserve(low, low + other.counts.shape[1] - 1)
+        start = low - self.offset
+        self.counts[:, start:start + other.counts.shape[1]] += other.counts
+
+    def bounds(self):
+        """Lower and upper edge of every bucket: bucket k holds (gamma ** (k - 1), gamma ** k]."""
+        keys = np.arange(self.offset, self.offset + self.counts.shape[1])
+        return np.exp((keys - 1) * self.logGamma), np.exp(keys * self.logGamma)
+
+
+class BalanceSketch:
+    """
+    Streaming, mergeable percentile sketch for a (paths x years) stream of
+    balances, in the style of DDSketch: every year keeps counts in
+    logarithmic buckets of relative width about 2 * 'relativeAccuracy', and
+    memory stays bounded by the range of balances rather than the number of
+    paths. Percentiles are placed within their bucket by rank, so they are
+    off by at most one bucket width and usually far less. Values whose size
+    is below 'minValue' (e.g. depleted balances) are counted as zero.
+    """
+
+    def __init__(self, years, relativeAccuracy=0.002, minValue=0.01):
+        self.years = years
+        self.relativeAccuracy = relativeAccuracy
+        self.minValue = minValue
+        self.logGamma = np.log1p(2 * relativeAccuracy / (1 - relativeAccuracy))
+        self.positive = _LogStore(years, self.logGamma)
+        self.negative = _LogStore(years, self.logGamma)
+        self.zeros = np.zeros(years, dtype=np.int64)
+        self.count = 0
+
+    def update(self, block):
+        """Add a (paths x years) block of balances."""
+        block = np.asarray(block, dtype=np.float64)
+        years = np.broadcast_to(np.arange(self.years), block.shape)
+        magnitude = np.abs(block)
+        small = magnitude < self.minValue
+        self.zeros += small.sum(axis=0)
+        for store, mask in ((self.positive, block >= self.minValue), (self.negative, block <= -self.minValue)):
+            keys = np.ceil(np.log(magnitude[mask]) / self.logGamma).astype(np.int64)
+            store.add(years[mask], keys)
+        self.count += block.shape[0]
+
+    def merge(self, other):
+        """Fold another sketch of the same years into this one."""
+        self.positive.merge(other.positive)
+        self.negative.merge(other.negative)
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def _orderStatistic(self, rank, counts, cumulative, lows, highs):
+        """
+        Estimate every year's 'rank'-th smallest value (0-based). The values
+        counted in a bucket are taken to be spread evenly across it, so the
+        j-th of c sits (j + 0.5) / c of the way between the bucket's edges.
+        """
+        bucket = (cumulative > rank).argmax(axis=1)
+        years = np.arange(self.years)
+        inBucket = counts[years, bucket]
+        position = (rank - (cumulative[years, bucket] - inBucket) + 0.5) / np.maximum(inBucket, 1)
+        return lows[bucket] + (highs[bucket] - lows[bucket]) * position
+
+    def percentiles(self, percentiles):
+        """
+        Return {percentile: per-year array} for the values seen so far,
+        interpolated between neighbouring order statistics like
+        numpy.percentile's default method.
+        """
+        counts = np.concatenate(
+            [self.negative.counts[:, ::-1], self.zeros[:, np.newaxis], self.positive.counts], axis=1
+        )
+        positiveLows, positiveHighs = self.positive.bounds()
+        negativeLows, negativeHighs = self.negative.bounds()
+        lows = np.concatenate([-negativeHighs[::-1], [0.0], positiveLows])
+        highs = np.concatenate([-negativeLows[::-1], [0.0], positiveHighs])
+        cumulative = np.cumsum(counts, axis=1)
+        bands = {}
+        for percentile in percentiles:
+            rank = percentile / 100 * (self.count - 1)
+            lower = np.floor(rank)
+            low = self._orderStatistic(lower, counts, cumulative, lows, highs)
+            high = self._orderStatistic(min(lower + 1, self.count - 1), counts, cumulative, lows, highs)
+            bands[percentile] = low + (high - low) * (rank - lower)
+        return bands
+
+
+class RunningMoments:
+    """
+    Per-year running mean and variance of a (paths x years) stream, updated
+    a block at a time with Chan's parallel formula so blocks and whole
+    streams can be merged.
+    """
+
+    def __init__(self, years):
+        self.count = 0
+        self.mean = np.zeros(years)
+        self.m2 = np.zeros(years)
+
+    def update(self, block):
+        block = np.asarray(block, dtype=np.float64)
+        other = RunningMoments(block.shape[1])
+        other.count = block.shape[0]
+        other.mean = block.mean(axis=0)
+        other.m2 = ((block - other.mean) ** 2).sum(axis=0)
+        self.merge(other)
+
+    def merge(self, other):
+        count = self.count + other.count
+        if count == 0:
+            return
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * other.count / count
+        self.m2 = self.m2 + other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+
+    def variance(self):
+        return self.m2 / max(self.count - 1, 1)
+
+    def std(self):
+        return np.sqrt(self.variance())
@@ -0,0 +1,110 @@
+import numpy as np
+
+
+# Periods per year for the usual step sizes.
+PERIODS_PER_YEAR = {"annual": 1, "quarterly": 4, "monthly": 12, "weekly": 52, "daily": 365}
+
+
+def periodRates(annualRates, periodsPerYear, years=None):
+    """
+    Per-period rates that compound to the given annual rates:
+    (1 + rate) ** (1 / periodsPerYear) - 1, each repeated for the periods of
+    its year. A single annual rate needs 'years' to know how long to run.
+    """
+    annualRates = np.asarray(annualRates, dtype=np.float64)
+    if annualRates.ndim == 0:
+        if years is None:
+            raise ValueError("A single annual rate needs 'years'")
+        annualRates = np.full(years, annualRates)
+    return np.repeat(np.expm1(np.log1p(annualRates) / periodsPerYear), periodsPerYear, axis=-1)
+
+
+def recurringFlows(periods, amount, every=1, start=0, stop=None):
+    """
+    Cash-flow schedule of 'amount' after every 'every'-th period from 'start'
+    up to (not including) 'stop'. Positive amounts are contributions,
+    negative ones withdrawals.
+    """
+    flows = np.zeros(periods)
+    flows[start:stop:every] = amount
+    return flows
+
+
+def lumpSums(periods, amounts):
+    """Cash-flow schedule from a {period: amount} mapping of one-off flows."""
+    flows = np.zeros(periods)
+    for period, amount in amounts.items():
+        flows[period] += amount
+    return flows
+
+
+def pauseFlows(flows, start, stop):
+    """Copy of a schedule with no cash flows from 'start' up to 'stop'."""
+    flows = np.array(flows, dtype=np.float64)
+    flows[..., start:stop] = 0.0
+    return flows
+
+
+def indexedWithdrawals(periods, amount, inflation, periodsPerYear, every=1, start=0):
+    """
+    Withdrawal schedule of 'amount' after every 'every'-th period from
+    'start', raised once a year by 'inflation' to keep its spending power.
+    Returned as negative flows, ready to add to a contribution schedule.
+    """
+    flows = np.zeros(periods)
+    paid = np.arange(start, periods, every)
+    flows[paid] = -amount * (1 + inflation) ** ((paid - start) // periodsPerYear)
+    return flows
+
+
+def simulateSchedule(principal, rates, flows, reportEvery=1, blockSize=4096):
+    """
+    Vectorized balance path for per-period 'rates' and a cash-flow schedule
+    'flows' applied after each period's growth: X_t = X_{t-1} * (1 + r_t) + f_t,
+    floored at zero once withdrawals exhaust the money. rates and flows are
+    scalars or arrays broadcast along the last (period) axis, so leading
+    axes run many scenarios at once; rates must stay above -100%.
+
+    Instead of a loop per period, each block of 'blockSize' periods is
+    solved in discounted money: with G_t the cumulative growth since the
+    block start and C_t = X_0 + sum(f_s / G_s for s <= t), the floored
+    balance is the Lindley form X_t = G_t * (C_t - min(0, min(C_s for s <= t))).
+    Restarting G at every block keeps the products well conditioned.
+
+    Returns a dict with the balance every 'reportEvery' periods (always
+    including the last) under 'balances', the 1-based 'periods' they
+    belong to, the 'final' balance and the 'depletion_period' in which the
+    balance first hit zero (inf if it never did).
+    """
+    rates, flows = np.broadcast_arrays(np.asarray(rates, dtype=np.float64), np.asarray(flows, dtype=np.float64))
+    periods = flows.shape[-1] if flows.ndim else 0
+    shape = np.broadcast_shapes(np.shape(principal), flows.shape[:-1])
+    balance = np.broadcast_to(np.asarray(principal, dtype=np.float64), shape).copy()
+    reportAt = np.arange(reportEvery - 1, periods, reportEvery)
+    if periods and (not len(reportAt) or reportAt[-1] != periods - 1):
+        reportAt = np.append(reportAt, periods - 1)
+    reported = np.empty(shape + (len(reportAt),))
+    depletion = np.full(shape, np.inf)
+
+    for start in range(0, periods, blockSize):
+        stop = min(start + blockSize, periods)
+        growth = np.cumprod(1 + rates[..., start:stop], axis=-1)
+        discounted = np.cumsum(flows[..., start:stop] / growth, axis=-1)
+        discounted += balance[..., np.newaxis]
+        lowest = np.minimum.accumulate(discounted, axis=-1)
+        np.minimum(lowest, 0.0, out=lowest)
+        block = (discounted - lowest) * growth
+
+        empty = block <= 0
+        firstEmpty = np.where(empty.any(axis=-1), empty.argmax(axis=-1) + start + 1, np.inf)
+        depletion = np.minimum(depletion, firstEmpty)
+        inBlock = (reportAt >= start) & (reportAt < stop)
+        reported[..., inBlock] = block[..., reportAt[inBlock] - start]
+        balance = block[..., -1]
+
+    return {
+        "balances": reported,
+        "periods": reportAt + 1,
+        "final": balance[()],
+        "depletion_period": depletion[()],
+    }
@@ -0,0 +1,108 @@
+import csv
+import os
+
+import numpy as np
+
+
+# File extensions read as headerless little-endian float64 arrays.
+RAW_EXTENSIONS = (".f64", ".bin", ".raw", ".dat")
+
+# CSV header names treated as labels rather than return series.
+INDEX_COLUMNS = ("date", "year", "month", "period", "time")
+
+
+def _csvLayout(path):
+    """
+    Return (header, numericColumns, skipRows) for a CSV file: the column
+    names if the first row is a header, and the indices of the columns whose
+    first data row parses as a number. Label columns, including numeric ones
+    named in INDEX_COLUMNS, are dropped.
+    """
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        first = next(reader, None)
+        if first is None:
+            raise ValueError(f"{path} is empty")
+        second = next(reader, None)
+
+    def numeric(field):
+        try:
+            float(field)
+            return True
+        except ValueError:
+            return False
+
+    if all(numeric(field) for field in first):
+        return None, list(range(len(first))), 0
+    header = [name.strip() for name in first]
+    row = second if second is not None else first
+    columns = [
+        i for i, field in enumerate(row)
+        if numeric(field) and header[i].lower() not in INDEX_COLUMNS
+    ]
+    return header, columns, 1
+
+
+def cachePath(path):
+    """Binary cache file used for a CSV return series."""
+    return path + ".cache.npy"
+
+
+def convertCsv(path, cache=None):
+    """
+    Parse a CSV return series once and save its numeric columns as a .npy
+    array (periods x columns, or 1-D for a single column). Returns the cache
+    path. The file is written under a temporary name and moved into place,
+    so readers never see a half-written cache.
+    """
+    cache = cache or cachePath(path)
+    _, columns, skipRows = _csvLayout(path)
+    data = np.loadtxt(path, delimiter=",", skiprows=skipRows, usecols=columns, dtype=np.float64, ndmin=1)
+    if len(columns) > 1:
+        data = data.reshape(-1, len(columns))
+    temporary = cache + ".tmp"
+    with open(temporary, "wb") as f:
+        np.save(f, data)
+    os.replace(temporary, cache)
+    return cache
+
+
+def loadReturns(path, column=None, columns=1):
+    """
+    Memory-map a return series without parsing it on every run.
+    .npy files are mapped directly; raw float64 files (RAW_EXTENSIONS) are
+    mapped as 'columns'-wide rows; CSV files are converted once to a .npy
+    cache next to them (refreshed when the CSV is newer) and then mapped.
+    column selects one series of a multi-column file by index, or by header
+    name for CSV files. Slices of the result are zero-copy views.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    header = None
+    if extension == ".npy":
+        data = np.load(path, mmap_mode="r")
+    elif extension in RAW_EXTENSIONS:
+        data = np.memmap(path, dtype="<f8", mode="r")
+        if columns > 1:
+            data = data.reshape(-1, columns)
+    elif extension == ".csv":
+        cache = cachePath(path)
+        if not os.path.exists(cache) or os.path.getmtime(cache) < os.path.getmtime(path):
+            convertCsv(path, cache)
+        data = np.load(cache, mmap_mode="r")
+        header, numericColumns, _ = _csvLayout(path)
+        if header is not None:
+            header = [header[i] for i in numericColumns]
+    else:
+        raise ValueError(f"Unsupported return series format: {extension or path!r}")
+
+    if column is None:
+        return data
+    if isinstance(column, str):
+        if header is None or column not in header:
+            raise KeyError(f"No column named {column!r} in {path}")
+        column = header.index(column)
+    if data.ndim == 1:
+        if column != 0:
+            raise IndexError(f"{path} holds a single series")
+        return data
+    return data[:, column]
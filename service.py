@@ -0,0 +1,302 @@
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from algorithms import (fixedFutureValue, depletionYears, maximumExpensed, variableInvestor, monteCarlo,
+                        streamingMonteCarlo)
+
+
+# How long the first request of a batch waits for others to join it.
+BATCH_WINDOW = 0.002
+MAX_BATCH = 4096
+
+# Recent latencies kept per endpoint for the p50/p99 figures.
+LATENCY_SAMPLES = 2048
+
+REQUIRED = object()
+
+# Request fields per endpoint: name -> (kind, default), REQUIRED marking
+# fields without a default. Kinds are checked by _validate.
+SCHEMAS = {
+    "/fixed": {"principal": ("number", REQUIRED), "rate": ("number", REQUIRED),
+               "years": ("years", REQUIRED), "contribution": ("number", REQUIRED)},
+    "/depletion": {"principal": ("number", REQUIRED), "withdrawal": ("number", REQUIRED),
+                   "rate": ("number", REQUIRED)},
+    "/optimal": {"principal": ("number", REQUIRED), "rate": ("number", REQUIRED), "years": ("years", REQUIRED)},
+    "/variable": {"principal": ("number", REQUIRED), "rates": ("rates", REQUIRED), "contribution": ("number", 0.0)},
+    "/montecarlo": {"principal": ("number", REQUIRED), "contribution": ("number", 0.0), "years": ("count", REQUIRED),
+                    "withdrawal": ("number", 0.0), "retire_years": ("count", 0), "mean": ("number", REQUIRED),
+                    "volatility": ("number", REQUIRED), "paths": ("paths", 10000),
+                    "distribution": ("distribution", "normal"), "seed": ("seed", None)},
+}
+
+DISTRIBUTIONS = ("normal", "lognormal")
+
+# Largest accepted values per endpoint field, so a single request cannot
+# ask for more simulation than a worker can hold.
+LIMITS = {"/montecarlo": {"paths": 1_000_000, "years": 100, "retire_years": 100}}
+
+# Monte Carlo requests with more path-years than this stream through
+# streamingMonteCarlo in blocks of this size instead of holding every path.
+EXACT_MONTE_CARLO_CELLS = 5_000_000
+
+
+class BadRequest(Exception):
+    """A request payload that fails validation; answered with 400."""
+
+
+def _isNumber(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    try:
+        return math.isfinite(value)
+    except OverflowError:
+        return False
+
+
+def _validate(path, payload):
+    """
+    Check a request payload against SCHEMAS[path] and return a new dict
+    with every field present, defaults filled in and numbers converted.
+    Raises BadRequest naming the first missing or invalid field.
+    """
+    if not isinstance(payload, dict):
+        raise BadRequest("expected a JSON object")
+    checked = {}
+    for name, (kind, default) in SCHEMAS[path].items():
+        if payload.get(name) is None:
+            if default is REQUIRED:
+                raise BadRequest(f"missing field {name!r}")
+            checked[name] = default
+            continue
+        value = payload[name]
+        if kind == "number" and _isNumber(value):
+            checked[name] = float(value)
+        elif kind == "years" and _isNumber(value) and value >= 0:
+            checked[name] = float(value)
+        elif kind in ("count", "paths", "seed") and _isNumber(value) and value == int(value) \
+                and value >= (1 if kind == "paths" else 0):
+            checked[name] = int(value)
+        elif kind == "rates" and isinstance(value, list) and all(_isNumber(rate) for rate in value):
+            checked[name] = [float(rate) for rate in value]
+        elif kind == "distribution" and value in DISTRIBUTIONS:
+            checked[name] = value
+        else:
+            raise BadRequest(f"invalid {kind} for {name!r}: {value!r}")
+    for name, limit in LIMITS.get(path, {}).items():
+        if checked[name] > limit:
+            raise BadRequest(f"{name!r} must be at most {limit:,}")
+    return checked
+
+
+class MicroBatcher:
+    """
+    Coalesce requests that arrive within BATCH_WINDOW seconds into one call
+    of a vectorized function. 'fields' names the request keys passed to it
+    as arrays, in order; the function returns one array of results.
+    """
+
+    def __init__(self, func, fields, window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        self.func = func
+        self.fields = fields
+        self.window = window
+        self.max_batch = max_batch
+        self.pending = []
+        self.timer = None
+
+    def __len__(self):
+        return len(self.pending)
+
+    def submit(self, payload):
+        args = tuple(payload[field] for field in self.fields)
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((args, future))
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+        return future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        columns = np.array([args for args, _ in batch]).T
+        try:
+            results = np.atleast_1d(self.func(*columns))
+        except Exception as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(float(result))
+
+
+def _variable(payload):
+    balance, _ = variableInvestor(payload["principal"], payload["rates"], payload["contribution"])
+    return {"balance": balance}
+
+
+def _monteCarlo(payload):
+    args = (payload["principal"], payload["contribution"], payload["years"], payload["withdrawal"],
+            payload["retire_years"], payload["mean"], payload["volatility"])
+    columns = max(payload["years"] + payload["retire_years"], 1)
+    if payload["paths"] * columns <= EXACT_MONTE_CARLO_CELLS:
+        result = monteCarlo(*args, paths=payload["paths"], distribution=payload["distribution"],
+                            seed=payload["seed"])
+    else:
+        result = streamingMonteCarlo(*args, paths=payload["paths"], distribution=payload["distribution"],
+                                     seed=payload["seed"], blockSize=EXACT_MONTE_CARLO_CELLS // columns)
+        result["mean"] = result["mean"].tolist()
+        result["std"] = result["std"].tolist()
+    result["percentiles"] = {str(p): band.tolist() for p, band in result["percentiles"].items()}
+    return result
+
+
+class PlannerService:
+    """
+    JSON-over-HTTP front end for algorithms.py. Cheap closed-form planners
+    (/fixed, /depletion, /optimal) are micro-batched on the event loop;
+    path-dependent work (/variable, /montecarlo) runs in an executor so the
+    loop keeps answering other requests. GET /metrics reports per-endpoint
+    request counts and p50/p99 latency plus the current queue depth.
+    """
+
+    def __init__(self, executor=None):
+        self.owns_executor = executor is None
+        self.executor = executor or self._new_executor()
+        self.batchers = {
+            "/fixed": (MicroBatcher(fixedFutureValue, ("principal", "rate", "years", "contribution")), "balance"),
+            "/depletion": (MicroBatcher(depletionYears, ("principal", "withdrawal", "rate")), "years"),
+            "/optimal": (MicroBatcher(maximumExpensed, ("principal", "rate", "years")), "withdrawal"),
+        }
+        self.jobs = {"/variable": _variable, "/montecarlo": _monteCarlo}
+        self.latencies = {path: deque(maxlen=LATENCY_SAMPLES) for path in [*self.batchers, *self.jobs]}
+        self.counts = dict.fromkeys(self.latencies, 0)
+        self.in_executor = 0
+
+    @staticmethod
+    def _new_executor():
+        # Workers are spawned rather than forked: forking a process that is
+        # already running an event loop and executor threads can deadlock.
+        return ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+
+    def _replace_broken_executor(self, broken):
+        """Swap in a fresh pool after a worker died, unless another request already did."""
+        if self.owns_executor and self.executor is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.executor = self._new_executor()
+
+    async def dispatch(self, method, path, payload):
+        """Return (status, body) for one request."""
+        if method == "GET" and path == "/metrics":
+            return 200, self.metrics()
+        if method != "POST" or path not in self.latencies:
+            return 404, {"error": f"No endpoint {method} {path}"}
+
+        started = time.perf_counter()
+        try:
+            payload = _validate(path, payload)
+        except BadRequest as exc:
+            return 400, {"error": f"Bad request: {exc}"}
+        try:
+            if path in self.batchers:
+                batcher, field = self.batchers[path]
+                value = await batcher.submit(payload)
+                body = {field: value if np.isfinite(value) else None}
+            else:
+                self.in_executor += 1
+                executor = self.executor
+                try:
+                    body = await asyncio.get_running_loop().run_in_executor(executor, self.jobs[path], payload)
+                except BrokenProcessPool:
+                    # A worker died (e.g. killed for memory) and took the
+                    # pool with it; later requests get a new one.
+                    self._replace_broken_executor(executor)
+                    raise
+                finally:
+                    self.in_executor -= 1
+        except Exception as exc:
+            # The payload was valid, so anything raised here is a server bug.
+            return 500, {"error": f"Internal error: {type(exc).__name__}: {exc}"}
+        self.latencies[path].append(time.perf_counter() - started)
+        self.counts[path] += 1
+        return 200, body
+
+    def metrics(self):
+        endpoints = {}
+        for path, samples in self.latencies.items():
+            stats = {"requests": self.counts[path]}
+            if samples:
+                p50, p99 = np.percentile(samples, [50, 99]) * 1000
+                stats.update(p50_ms=round(p50, 3), p99_ms=round(p99, 3))
+            endpoints[path] = stats
+        return {
+            "endpoints": endpoints,
+            "queue_depth": sum(len(batcher) for batcher, _ in self.batchers.values()) + self.in_executor,
+        }
+
+    async def handle(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                try:
+                    payload = json.loads(body) if body else {}
+                except json.JSONDecodeError as exc:
+                    status, response = 400, {"error": f"Invalid JSON: {exc}"}
+                else:
+                    status, response = await self.dispatch(method, path.split("?", 1)[0], payload)
+
+                data = json.dumps(response).encode()
+                reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}[status]
+                writer.write(
+                    f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host="127.0.0.1", port=8765):
+    service = PlannerService()
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"RetirePlan service listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.executor.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the RetirePlan planners as a local JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
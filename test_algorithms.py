@@ -0,0 +1,28 @@
+import math
+
+import numpy as np
+
+from algorithms import fixedFutureValue, requiredRate, requiredYears
+
+
+def test_required_rate_converges_far_from_start():
+    # Newton from 0.05 used to jump near the top of the bracket and stop
+    # after maxIterations on 0.3663, 720x over the target balance.
+    target = fixedFutureValue(69834.63, 0.19304, 49, 2012.23)
+    assert math.isclose(requiredRate(69834.63, 49, 2012.23, target), 0.19304, rel_tol=1e-9)
+
+
+def test_required_rate_recovers_grid():
+    years, rates = np.meshgrid(np.arange(1, 81), np.linspace(-0.1, 0.3, 80))
+    target = fixedFutureValue(1e5, rates, years, 5e3)
+    np.testing.assert_allclose(requiredRate(1e5, years, 5e3, target), rates, rtol=0, atol=1e-8)
+
+
+def test_required_rate_unconverged_is_nan():
+    target = fixedFutureValue(69834.63, 0.19304, 49, 2012.23)
+    assert math.isnan(requiredRate(69834.63, 49, 2012.23, target, maxIterations=1))
+
+
+def test_required_years_total_loss():
+    assert requiredYears(100, -1.0, 10, 1000) == math.inf
+    assert requiredYears(100, -1.0, 2000, 1000) == 1
@@ -1,12 +1,167 @@
-def plot_balance_text(accum_history, retire_history):
-    print("\n📈 BALANCE OVER TIME\n")
-    print("Accumulation = '█' | Depletion = '▓'\n")
+import shutil
+import sys
 
-    combined = accum_history + retire_history
-    max_bal = max(combined) if combined else 1
+import numpy as np
 
-    for i, bal in enumerate(combined, 1):
-        bar_len = int((bal / max_bal) * 50)
-        bar_char = '█' if i <= len(accum_history) else '▓'
-        print(f"Year {i:2d} | {bar_char * bar_len} {bal:,.2f} JMD")
+from history import Timeline
 
+
+# Most rows plot_balance_text draws; longer horizons are bucketed to fit.
+MAX_ROWS = 60
+
+# Most points per line in exported charts; longer series are decimated.
+MAX_POINTS = 2000
+
+
+def _buckets(values, rows):
+    """
+    Split 'values' into at most 'rows' contiguous buckets and return
+    (starts, ends, minimums, maximums, lasts), one entry per bucket.
+    """
+    edges = np.unique(np.linspace(0, len(values), rows + 1).astype(np.int64))
+    starts, ends = edges[:-1], edges[1:]
+    return (starts, ends, np.minimum.reduceat(values, starts),
+            np.maximum.reduceat(values, starts), values[ends - 1])
+
+
+def plot_balance_text(accum_history, retire_history, max_rows=MAX_ROWS, width=None, file=None):
+    """
+    Draw the balance timeline as a text bar chart sized to the terminal.
+    Up to 'max_rows' years are drawn one per row; longer horizons are
+    grouped into buckets of consecutive years showing the last balance
+    in the bucket, with the bar shaded between its minimum and maximum.
+    Rows are split between the phases by their length, and the chart is
+    written to 'file' (stdout by default) in a single write, so the cost
+    depends on the screen size rather than the horizon.
+    """
+    file = file or sys.stdout
+    width = width or shutil.get_terminal_size().columns
+    combined = Timeline(accum_history, retire_history)
+    max_bal = combined.max(default=1) or 1
+    total = len(combined)
+
+    out = ["\n📈 BALANCE OVER TIME\n\n", "Accumulation = '█' | Depletion = '▓'"]
+    if total > max_rows:
+        out.append(" | '░' spans each bucket's min to max")
+    out.append("\n\n")
+
+    label_width = len(f"Years {total:,}-{total:,}") if total > max_rows else max(len(f"Year {total:2d}"), 7)
+    value_width = len(f"{max_bal:,.2f} JMD")
+    bar_width = max(10, min(width - label_width - value_width - 5, 100))
+
+    offset = 0
+    for segment, bar_char in ((accum_history, '█'), (retire_history, '▓')):
+        values = np.asarray(segment, dtype=np.float64)
+        if not len(values):
+            continue
+        if total <= max_rows:
+            for i, bal in enumerate(values.tolist(), offset + 1):
+                bar_len = int((bal / max_bal) * bar_width)
+                out.append(f"{f'Year {i:2d}':<{label_width}} | {bar_char * bar_len} {bal:,.2f} JMD\n")
+        else:
+            rows = max(1, round(max_rows * len(values) / total))
+            starts, ends, lows, highs, lasts = _buckets(values, rows)
+            low_lens = (np.clip(lows / max_bal, 0, 1) * bar_width).astype(np.int64)
+            high_lens = (np.clip(highs / max_bal, 0, 1) * bar_width).astype(np.int64)
+            for start, end, low_len, high_len, last in zip(
+                    (starts + offset + 1).tolist(), (ends + offset).tolist(),
+                    low_lens.tolist(), high_lens.tolist(), lasts.tolist()):
+                label = f"Year {start:,}" if start == end else f"Years {start:,}-{end:,}"
+                bar = bar_char * low_len + '░' * (high_len - low_len)
+                out.append(f"{label:<{label_width}} | {bar:<{bar_width}} {last:,.2f} JMD\n")
+        offset += len(values)
+
+    file.write("".join(out))
+    file.flush()
+
+
+def minmax_indices(values, max_points=MAX_POINTS):
+    """
+    Indices of at most about 'max_points' samples of 'values' that keep the
+    first and last points and the minimum and maximum of every bucket, so
+    peaks and depletion survive decimation. Returns all indices for short
+    series.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n <= max_points:
+        return np.arange(n)
+    size = -(-n // max(1, max_points // 2))
+    full = n - n % size
+    blocks = values[:full].reshape(-1, size)
+    base = np.arange(0, full, size)
+    picks = [base + blocks.argmin(axis=1), base + blocks.argmax(axis=1), [0, n - 1]]
+    if full < n:
+        tail = values[full:]
+        picks.append([full + tail.argmin(), full + tail.argmax()])
+    return np.unique(np.concatenate(picks))
+
+
+def _figure(title, width=10, height=5):
+    # Figures are built on the Agg canvas directly rather than through
+    # pyplot, so exports need no display and keep no global figure state.
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(width, height))
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    axes.set_title(title)
+    axes.set_xlabel("Year")
+    axes.set_ylabel("Balance (JMD)")
+    axes.grid(True, alpha=0.3)
+    return figure, axes
+
+
+def save_timeline_chart(accum_history, retire_history, path, max_points=MAX_POINTS, title="Balance over time"):
+    """
+    Save the accumulation and depletion timeline as an image; the format
+    (PNG, SVG, ...) follows the file extension of 'path'. Each phase is
+    decimated to about 'max_points' points with minmax_indices.
+    """
+    figure, axes = _figure(title)
+    offset = 0
+    for segment, label, color in ((accum_history, "Accumulation", "tab:blue"),
+                                  (retire_history, "Retirement", "tab:orange")):
+        values = np.asarray(segment, dtype=np.float64)
+        if len(values):
+            keep = minmax_indices(values, max_points)
+            axes.plot(keep + offset + 1, values[keep], label=label, color=color, linewidth=1.2)
+        offset += len(values)
+    if offset:
+        axes.legend()
+    figure.savefig(path, dpi=100)
+    return path
+
+
+def save_fan_chart(percentiles, path, accum_years=0, max_points=MAX_POINTS, title="Monte Carlo balance percentiles"):
+    """
+    Save a fan chart of Monte Carlo percentile bands, as returned in the
+    'percentiles' entry of algorithms.monteCarlo, to 'path'. The outer and
+    inner percentile pairs are shaded and the median drawn as a line; all
+    bands share one set of decimated years so they stay aligned.
+    """
+    figure, axes = _figure(title)
+    levels = sorted(percentiles)
+    bands = {p: np.asarray(percentiles[p], dtype=np.float64) for p in levels}
+    if not bands:
+        figure.savefig(path, dpi=100)
+        return path
+    keep = np.unique(np.concatenate([minmax_indices(band, max_points) for band in bands.values()]))
+    years = keep + 1
+    for i in range(len(levels) // 2):
+        low, high = levels[i], levels[-1 - i]
+        axes.fill_between(years, bands[low][keep], bands[high][keep], color="tab:blue",
+                          alpha=0.15 + 0.15 * i, linewidth=0, label=f"{low}th-{high}th percentile")
+    if len(levels) % 2:
+        middle = levels[len(levels) // 2]
+        axes.plot(years, bands[middle][keep], color="tab:blue", linewidth=1.5, label=f"{middle}th percentile")
+    if 0 < accum_years < len(bands[levels[0]]):
+        axes.axvline(accum_years + 0.5, color="grey", linestyle="--", linewidth=1, label="Retirement")
+    axes.legend(loc="upper left")
+    figure.savefig(path, dpi=100)
+    return path
+
+
+# Chart kinds by name, mapped to their save functions.
+CHARTS = {"timeline": save_timeline_chart, "fan": save_fan_chart}